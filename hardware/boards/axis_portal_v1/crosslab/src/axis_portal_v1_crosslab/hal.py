@@ -1,29 +1,32 @@
-import asyncio
+from pathlib import Path
+from typing import Optional
 
 from spi_driver import SpiRegisters
 from spi_driver.modules import Bit, Motor, Numeric
+from spi_driver.register_map import RegisterMap
 
+# modules and init writes of the board, see spi_driver.register_map
+MAP_PATH = Path(__file__).with_name("register_map.json")
 
-class HAL:
-    def __init__(self) -> None:
-        registers = SpiRegisters()
-
-        self.Proximity = Bit(registers, 2, 0)
-        self.LimitZTop = Bit(registers, 3, 7)
-        self.LimitZBottom = Bit(registers, 3, 6)
-        self.InYRef = Bit(registers, 3, 5)
-        self.LimitYBack = Bit(registers, 3, 4)
-        self.LimitYFront = Bit(registers, 3, 3)
-        self.InXRef = Bit(registers, 3, 2)
-        self.LimitXRight = Bit(registers, 3, 1)
-        self.LimitXLeft = Bit(registers, 3, 0)
-        self.XEncoder = Numeric(registers, 9, 16, "little")
-        self.YEncoder = Numeric(registers, 11, 16, "little")
-        self.XMotor = Motor(registers, 13, 14)
-        self.YMotor = Motor(registers, 15, 16)
-        self.ZMotor = Motor(registers, 17, 18)
-        self.Magnet = Bit(registers, 19, 0)
 
-        self.Light = Bit(registers, 23, 7)
+class HAL:
+    # built from the register map
+    Proximity: Bit
+    LimitZTop: Bit
+    LimitZBottom: Bit
+    InYRef: Bit
+    LimitYBack: Bit
+    LimitYFront: Bit
+    InXRef: Bit
+    LimitXRight: Bit
+    LimitXLeft: Bit
+    XEncoder: Numeric
+    YEncoder: Numeric
+    XMotor: Motor
+    YMotor: Motor
+    ZMotor: Motor
+    Magnet: Bit
+    Light: Bit
 
-        asyncio.create_task(registers.communicate_coroutine())
+    def __init__(self, registers: Optional[SpiRegisters] = None) -> None:
+        RegisterMap.open(str(MAP_PATH), self, registers)
@@ -1,36 +1,29 @@
-import asyncio
+from pathlib import Path
+from typing import Optional
+
 from spi_driver import SpiRegisters
 from spi_driver.modules import Bit, Motor, Numeric, StepperMotor
+from spi_driver.register_map import RegisterMap
 
+# modules and init writes of the board, see spi_driver.register_map
+MAP_PATH = Path(__file__).with_name("register_map.json")
 
-class HAL:
-    def __init__(self) -> None:
-        registers = SpiRegisters()
-
-        self.Proximity = Bit(registers, 2, 6)
-        self.LimitZTop = Bit(registers, 2, 5)
-        self.LimitZBottom = Bit(registers, 2, 4)
-        self.LimitYFront = Bit(registers, 2, 3)
-        self.LimitYBack = Bit(registers, 2, 2)
-        self.LimitXRight = Bit(registers, 2, 1)
-        self.LimitXLeft = Bit(registers, 2, 0)
-        self.XEncoder = Numeric(registers, 7, 16, "little")
-        self.YEncoder = Numeric(registers, 9, 16, "little")
-        self.XMotor = StepperMotor(registers, 11, 12)
-        self.YMotor = StepperMotor(registers, 17, 18)
-        self.ZMotor = Motor(registers, 23, 24)
-        self.Magnet = Bit(registers, 25, 0)
 
-        registers.spi.xfer2([0x80, 16, 0x09, 0x45, 0x57])  # Init XMotor
-        registers.spi.xfer2([0x80, 16, 0x0A, 0x00, 0x00])
-        registers.spi.xfer2([0x80, 16, 0x0D, 0x0A, 0x0F])
-        registers.spi.xfer2([0x80, 16, 0x0E, 0x00, 0x60])
-        registers.spi.xfer2([0x80, 16, 0x00, 0x00, 0x04])
-
-        registers.spi.xfer2([0x80, 22, 0x09, 0x45, 0x57])  # Init ZMotor
-        registers.spi.xfer2([0x80, 22, 0x0A, 0x00, 0x00])
-        registers.spi.xfer2([0x80, 22, 0x0D, 0x0A, 0x0F])
-        registers.spi.xfer2([0x80, 22, 0x0E, 0x00, 0x60])
-        registers.spi.xfer2([0x80, 22, 0x00, 0x00, 0x04])
+class HAL:
+    # built from the register map
+    Proximity: Bit
+    LimitZTop: Bit
+    LimitZBottom: Bit
+    LimitYFront: Bit
+    LimitYBack: Bit
+    LimitXRight: Bit
+    LimitXLeft: Bit
+    XEncoder: Numeric
+    YEncoder: Numeric
+    XMotor: StepperMotor
+    YMotor: StepperMotor
+    ZMotor: Motor
+    Magnet: Bit
 
-        asyncio.create_task(registers.communicate_coroutine())
+    def __init__(self, registers: Optional[SpiRegisters] = None) -> None:
+        RegisterMap.open(str(MAP_PATH), self, registers)
@@ -1,24 +1,17 @@
-import asyncio
-from spi_driver import SpiRegisters
-from spi_driver.modules import Gpio
-
-
-class HAL:
-    def __init__(self) -> None:
-        registers = SpiRegisters()
+from pathlib import Path
+from typing import Optional
 
-        self.gpio = [Gpio(registers, 2 + i) for i in range(64)]
+from spi_driver import SpiRegisters
+from spi_driver.modules import GpioBank
+from spi_driver.register_map import RegisterMap
 
-        # Init Crossbar
-        for i in range(7):
-            registers.spi.xfer2([0x80, 1, i + 1])
-            registers.spi.xfer2([0x80, 9, 7, 6, 5, 4, 3, 2, 1, 0])
-        registers.spi.xfer2([0x80, 1, 8])
-        registers.spi.xfer2([0x80, 9, 8, 6, 5, 4, 3, 2, 1, 0])
+# modules and init writes of the board, see spi_driver.register_map
+MAP_PATH = Path(__file__).with_name("register_map.json")
 
-        registers.spi.xfer2([0x80, 1, 0])
 
-        # Set PWM driver 12
-        registers.spi.xfer2([0x80, 80, 128])
+class HAL:
+    # built from the register map
+    gpio: GpioBank
 
-        asyncio.create_task(registers.communicate_coroutine())
+    def __init__(self, registers: Optional[SpiRegisters] = None) -> None:
+        RegisterMap.open(str(MAP_PATH), self, registers, threaded=False)
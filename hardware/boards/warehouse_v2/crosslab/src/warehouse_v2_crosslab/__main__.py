@@ -4,7 +4,7 @@ import argparse
 import asyncio
 import os
 from json import JSONDecoder
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 
 from crosslab.api_client.improved_client import APIClient
 from crosslab.soa_client.device_handler import DeviceHandler
@@ -12,6 +12,7 @@ from crosslab.soa_services.electrical import ElectricalConnectionService
 from crosslab.soa_services.electrical.signal_interfaces.gpio import (
     ConstractableGPIOInterface, GPIOInterface)
 from crosslab.soa_services.webcam import WebcamService__Producer, WebcamTrack
+from spi_driver.modules import Numeric, Subscription
 from warehouse_v2_crosslab.hal import HAL
 from warehouse_v2_crosslab.model_logic import evaluateActuators
 
@@ -137,6 +138,12 @@ def virtualZSensor(value: int, position: int):
     return False
 
 
+def onEncoder(encoder: Numeric, handler: Callable[[int], None]):
+    # the virtual sensors follow the encoders at most 20 times per second, so
+    # faster polling does not multiply the interface updates
+    encoder.on("change", Subscription(handler, max_rate=20))
+
+
 def newSensorInterface(interface):
     global hal  # noqa: F824
     if isinstance(interface, GPIOInterface):
@@ -178,64 +185,64 @@ def newSensorInterface(interface):
             hal.x_left.on("change", setBool)
             value = hal.x_left.value()
         elif name == "shelf_x_1":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 0)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 0)))
             value = virtualXSensor(hal.XEncoder.value(), 0)
         elif name == "shelf_x_2":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 1)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 1)))
             value = virtualXSensor(hal.XEncoder.value(), 1)
         elif name == "shelf_x_3":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 2)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 2)))
             value = virtualXSensor(hal.XEncoder.value(), 2)
         elif name == "shelf_x_4":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 3)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 3)))
             value = virtualXSensor(hal.XEncoder.value(), 3)
         elif name == "shelf_x_5":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 4)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 4)))
             value = virtualXSensor(hal.XEncoder.value(), 4)
         elif name == "shelf_x_6":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 5)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 5)))
             value = virtualXSensor(hal.XEncoder.value(), 5)
         elif name == "shelf_x_7":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 6)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 6)))
             value = virtualXSensor(hal.XEncoder.value(), 6)
         elif name == "shelf_x_8":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 7)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 7)))
             value = virtualXSensor(hal.XEncoder.value(), 7)
         elif name == "shelf_x_9":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 8)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 8)))
             value = virtualXSensor(hal.XEncoder.value(), 8)
         elif name == "shelf_x_10":
-            hal.XEncoder.on("change", lambda value: setBool(virtualXSensor(value, 9)))
+            onEncoder(hal.XEncoder, lambda value: setBool(virtualXSensor(value, 9)))
             value = virtualXSensor(hal.XEncoder.value(), 9)
         elif name == "shelf_z_1_below":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 0)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 0)))
             value = virtualZSensor(hal.XEncoder.value(), 0)
         elif name == "shelf_z_1_above":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 1)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 1)))
             value = virtualZSensor(hal.XEncoder.value(), 1)
         elif name == "shelf_z_2_below":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 2)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 2)))
             value = virtualZSensor(hal.XEncoder.value(), 2)
         elif name == "shelf_z_2_above":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 3)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 3)))
             value = virtualZSensor(hal.XEncoder.value(), 3)
         elif name == "shelf_z_3_below":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 4)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 4)))
             value = virtualZSensor(hal.XEncoder.value(), 4)
         elif name == "shelf_z_3_above":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 5)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 5)))
             value = virtualZSensor(hal.XEncoder.value(), 5)
         elif name == "shelf_z_4_below":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 6)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 6)))
             value = virtualZSensor(hal.XEncoder.value(), 6)
         elif name == "shelf_z_4_above":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 7)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 7)))
             value = virtualZSensor(hal.XEncoder.value(), 7)
         elif name == "shelf_z_5_below":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 8)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 8)))
             value = virtualZSensor(hal.XEncoder.value(), 8)
         elif name == "shelf_z_5_above":
-            hal.ZEncoder.on("change", lambda value: setBool(virtualZSensor(value, 9)))
+            onEncoder(hal.ZEncoder, lambda value: setBool(virtualZSensor(value, 9)))
             value = virtualZSensor(hal.XEncoder.value(), 9)
 
         interface.changeDriver("strongH" if value else "strongL")
@@ -1,7 +1,12 @@
 import asyncio
-from typing import List, Literal
+from pathlib import Path
+from typing import List, Literal, Optional
 from spi_driver import SpiRegisters
-from spi_driver.modules import Bit, Motor, StepperMotor, Numeric
+from spi_driver.modules import Bit, Encoder, Motor, StepperMotor, Numeric
+from spi_driver.register_map import RegisterMap
+
+# modules and init writes of the board, see spi_driver.register_map
+MAP_PATH = Path(__file__).with_name("register_map.json")
 
 xPositions = [
     607,
@@ -33,7 +38,7 @@ class CorrectedMotor:
     def __init__(
         self,
         motor: Motor,
-        encoder: Numeric,
+        encoder: Encoder,
         holdBit: Bit,
         validPostions: List[int],
         allowedDeviation: int = 100,
@@ -46,9 +51,7 @@ class CorrectedMotor:
         self.allowedDeviation = allowedDeviation
         self.correctingSpeed = correctingSpeed
 
-        self.encoder.on("change", self.encoderChange)
         self.state = "stopped"
-        self.encoderChanged = False
 
     async def correctingTask(self):
         self.holdBit.set(True)
@@ -58,9 +61,10 @@ class CorrectedMotor:
         elif self.state == "correctingForward":
             self.motor.set(-self.correctingSpeed)
 
-        while self.encoderChanged:
-            self.encoderChanged = False
-            await asyncio.sleep(0.05)
+        # the hold bit stops the axis at the next valid position
+        self.encoder.drive(True)
+        await self.encoder.stopped()
+        self.encoder.drive(False)
         self.motor.set(0)
         self.holdBit.set(False)
 
@@ -89,9 +93,6 @@ class CorrectedMotor:
         except IndexError:
             return currentPos, 0xFFFFFFFF
 
-    def encoderChange(self, value: int):
-        self.encoderChanged = True
-
     def set(self, value: int):
         if value < -255 or value > 255:
             raise ValueError("value must be between -256 and 256")
@@ -122,61 +123,52 @@ class CorrectedMotor:
 
 
 class HAL:
-    def __init__(self) -> None:
-        registers = SpiRegisters()
-        self.overrideY = Bit(registers, 1, 4)
-        self.hold_z = Bit(registers, 1, 3)
-        self.hold_x = Bit(registers, 1, 2)
-        self.reset_z_enc = Bit(registers, 1, 1)
-        self.reset_x_enc = Bit(registers, 1, 0)
-        self.inductive = Bit(registers, 2, 6)
-        self.z_top = Bit(registers, 2, 5)
-        self.z_bottom = Bit(registers, 2, 4)
-        self.y_inside = Bit(registers, 2, 3)
-        self.y_outside = Bit(registers, 2, 2)
-        self.x_right = Bit(registers, 2, 1)
-        self.x_left = Bit(registers, 2, 0)
-        self.x1 = Bit(registers, 3, 0)
-        self.x2 = Bit(registers, 3, 1)
-        self.x3 = Bit(registers, 3, 2)
-        self.x4 = Bit(registers, 3, 3)
-        self.x5 = Bit(registers, 3, 4)
-        self.x6 = Bit(registers, 3, 5)
-        self.x7 = Bit(registers, 3, 6)
-        self.x8 = Bit(registers, 3, 7)
-        self.x9 = Bit(registers, 4, 0)
-        self.x10 = Bit(registers, 4, 1)
-        self.z1 = Bit(registers, 4, 2)
-        self.z2 = Bit(registers, 4, 3)
-        self.z3 = Bit(registers, 4, 4)
-        self.z4 = Bit(registers, 4, 5)
-        self.z5 = Bit(registers, 4, 6)
-        self.XEncoder = Numeric(registers, 9, 16, "little")
-        self.ZEncoder = Numeric(registers, 11, 16, "little")
-        self.uncorrectedXMotor = StepperMotor(registers, 13, 14)
+    # built from the register map
+    overrideY: Bit
+    hold_z: Bit
+    hold_x: Bit
+    reset_z_enc: Bit
+    reset_x_enc: Bit
+    inductive: Bit
+    z_top: Bit
+    z_bottom: Bit
+    y_inside: Bit
+    y_outside: Bit
+    x_right: Bit
+    x_left: Bit
+    x1: Bit
+    x2: Bit
+    x3: Bit
+    x4: Bit
+    x5: Bit
+    x6: Bit
+    x7: Bit
+    x8: Bit
+    x9: Bit
+    x10: Bit
+    z1: Bit
+    z2: Bit
+    z3: Bit
+    z4: Bit
+    z5: Bit
+    XEncoder: Numeric
+    ZEncoder: Numeric
+    uncorrectedXMotor: StepperMotor
+    XMotion: Encoder
+    YMotor: Motor
+    uncorrectedZMotor: StepperMotor
+    ZMotion: Encoder
+
+    def __init__(self, registers: Optional[SpiRegisters] = None) -> None:
+        RegisterMap.open(str(MAP_PATH), self, registers)
+
         self.XMotor = CorrectedMotor(
-            self.uncorrectedXMotor, self.XEncoder, self.hold_x, xPositions, 300, 50
+            self.uncorrectedXMotor, self.XMotion, self.hold_x, xPositions, 300, 50
         )
-        self.YMotor = Motor(registers, 19, 20)
-        self.uncorrectedZMotor = StepperMotor(registers, 21, 22)
         self.ZMotor = CorrectedMotor(
-            self.uncorrectedZMotor, self.ZEncoder, self.hold_z, zPositions, 5000, 20
+            self.uncorrectedZMotor, self.ZMotion, self.hold_z, zPositions, 5000, 20
         )
 
-        registers.spi.xfer2([0x80, 18, 0x09, 0x45, 0x57])  # Init XMotor
-        registers.spi.xfer2([0x80, 18, 0x0A, 0x00, 0x00])
-        registers.spi.xfer2([0x80, 18, 0x0D, 0x0A, 0x0F])
-        registers.spi.xfer2([0x80, 18, 0x0E, 0x00, 0x60])
-        registers.spi.xfer2([0x80, 18, 0x00, 0x00, 0x04])
-
-        registers.spi.xfer2([0x80, 26, 0x09, 0x45, 0x57])  # Init ZMotor
-        registers.spi.xfer2([0x80, 26, 0x0A, 0x00, 0x00])
-        registers.spi.xfer2([0x80, 26, 0x0D, 0x0A, 0x0F])
-        registers.spi.xfer2([0x80, 26, 0x0E, 0x00, 0x60])
-        registers.spi.xfer2([0x80, 26, 0x00, 0x00, 0x04])
-
-        asyncio.create_task(registers.communicate_coroutine())
-
     async def init_sequence(self):
         self.uncorrectedXMotor.set(0)
         self.uncorrectedZMotor.set(0)
@@ -221,3 +213,6 @@ class HAL:
         self.reset_x_enc.set(False)
         self.reset_z_enc.set(False)
         await asyncio.sleep(0.1)
+        # the jumps to zero are no motion
+        self.XMotion.reset()
+        self.ZMotion.reset()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# Benchmarks of the spi_driver hot paths and the board HALs against an
+# in-memory transport. Every benchmark reports the time of one operation as
+# the best of several repetitions. Register changes are made on the transport
+# and picked up by communicate(), like on the board. The cycle benchmarks run
+# the board register maps against the bus emulator and also report the time
+# a cycle would take on the bus.
+#
+#   python benchmarks/suite.py --output baseline.json
+#   python benchmarks/suite.py --compare baseline.json
+#
+# With --compare the exit status is 1 if a benchmark got slower than the
+# threshold.
+import argparse
+import asyncio
+import importlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from spi_driver import SpiRegisters
+from spi_driver.emulator import BusEmulator
+from spi_driver.modules import BinInput, Numeric
+from spi_driver.register_map import load_map
+from spi_driver.transports import MemoryTransport
+
+BOARDS_DIR = Path(__file__).resolve().parents[3] / "boards"
+BOARDS = ["axis_portal_v1", "axis_portal_v2", "warehouse_v2", "mole"]
+
+# a benchmark returns a function running one operation, its iteration count
+# and the bus emulator whose timing is reported, if any
+Benchmark = Callable[[], Tuple[Callable[[], None], int, Optional[BusEmulator]]]
+
+# register bits toggled every fourth cycle, like running encoders and sensors
+CYCLE_TOGGLES = {
+    "mole": [(2 + i, 0) for i in range(0, 64, 8)],
+    "warehouse_v2": [(9, 1), (11, 1), (2, 0)],
+}
+
+
+def communicate(count: int) -> Benchmark:
+    # count registers with gaps of two, a callback on every register and one
+    # percent of the registers changing per cycle
+    def setup():
+        bus = MemoryTransport()
+        registers = SpiRegisters(transport=bus)
+        addresses = [i * 3 for i in range(count)]
+        for address in addresses:
+            registers.add_register(address, _noop)
+        moving = addresses[::100]
+        registers.communicate()
+
+        def run():
+            for address in moving:
+                bus.registers[address] ^= 1
+            registers.communicate()
+
+        return run, max(100, 100000 // count), None
+
+    return setup
+
+
+def fanout(count: int) -> Benchmark:
+    # one changing register with count callbacks
+    def setup():
+        bus = MemoryTransport()
+        registers = SpiRegisters(transport=bus)
+        for _ in range(count):
+            registers.add_register(0x10, lambda registers: None)
+        registers.communicate()
+
+        def run():
+            bus.registers[0x10] ^= 1
+            registers.communicate()
+
+        return run, 1000, None
+
+    return setup
+
+
+def bin_input(changed: int) -> Benchmark:
+    # 64 signals in 8 registers, changed signals spread over the registers
+    # toggle every cycle
+    def setup():
+        bus = MemoryTransport()
+        registers = SpiRegisters(transport=bus)
+        inputs = BinInput(registers, 0x10, [f"signal{i}" for i in range(64)])
+        inputs.on("change", lambda name, value: None)
+        registers.communicate()
+        masks: Dict[int, int] = dict()
+        for signal in range(0, 64, 64 // changed):
+            address = 0x10 + signal // 8
+            masks[address] = masks.get(address, 0) | 1 << signal % 8
+        toggles = list(masks.items())
+
+        def run():
+            for address, mask in toggles:
+                bus.registers[address] ^= mask
+            registers.communicate()
+
+        return run, 1000, None
+
+    return setup
+
+
+def numeric_storm(count: int) -> Benchmark:
+    # count 16 bit encoders changing every cycle
+    def setup():
+        bus = MemoryTransport()
+        registers = SpiRegisters(transport=bus)
+        encoders = [Numeric(registers, 0x10 + 2 * i) for i in range(count)]
+        for encoder in encoders:
+            encoder.on("change", lambda value: None)
+        registers.communicate()
+        values = [0]
+
+        def run():
+            values[0] += 257
+            for i in range(count):
+                bus.registers[0x10 + 2 * i] = values[0] & 0xFF
+                bus.registers[0x11 + 2 * i] = (values[0] >> 8) & 0xFF
+            registers.communicate()
+
+        return run, 1000, None
+
+    return setup
+
+
+def hal(board: str) -> Benchmark:
+    # construction of the board HAL including its SpiRegisters
+    def setup():
+        sys.path.insert(0, str(BOARDS_DIR / board / "crosslab" / "src"))
+        HAL = importlib.import_module(f"{board}_crosslab.hal").HAL
+        loop = asyncio.new_event_loop()
+
+        def run():
+            loop.run_until_complete(_construct(HAL))
+
+        return run, 200, None
+
+    return setup
+
+
+def cycle(board: str) -> Benchmark:
+    # communicate() with the register map of the board
+    def setup():
+        path = BOARDS_DIR / board / "crosslab" / "src" / f"{board}_crosslab"
+        bus = BusEmulator()
+        registers = SpiRegisters(transport=bus)
+        load_map(str(path / "register_map.json")).build(registers)
+        registers.communicate()
+        toggles = CYCLE_TOGGLES[board]
+        cycles = [0]
+
+        def run():
+            if cycles[0] % 4 == 0:
+                for address, bit in toggles:
+                    bus.registers[address] ^= 1 << bit
+            cycles[0] += 1
+            registers.communicate()
+
+        return run, 2000, bus
+
+    return setup
+
+
+async def _construct(HAL):
+    HAL(SpiRegisters(transport=MemoryTransport()))
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+
+
+def _noop(registers: SpiRegisters):
+    pass
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "communicate/10": communicate(10),
+    "communicate/100": communicate(100),
+    "communicate/1000": communicate(1000),
+    "fanout/10": fanout(10),
+    "fanout/100": fanout(100),
+    "bin_input/64": bin_input(64),
+    "bin_input/64/4": bin_input(4),
+    "numeric_storm/32": numeric_storm(32),
+    **{f"cycle/{board}": cycle(board) for board in CYCLE_TOGGLES},
+    **{f"hal/{board}": hal(board) for board in BOARDS},
+}
+
+
+def measure(benchmark: Benchmark, repeat: int) -> dict:
+    run, iterations, bus = benchmark()
+    if bus is not None:
+        bus.reset_timing()
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            run()
+        times.append((time.perf_counter() - start) / iterations)
+    result = {
+        "best": min(times),
+        "mean": sum(times) / len(times),
+        "iterations": iterations,
+        "repeat": repeat,
+    }
+    if bus is not None:
+        # wire time and frames of one operation at the emulated clock rate
+        result["bus"] = bus.bus_time / (iterations * repeat)
+        result["frames"] = bus.frames / (iterations * repeat)
+    return result
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    regressed = False
+    print(f"{'benchmark':<24} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<24} {'-':>12} {result['best'] * 1e6:10.2f}us {'new':>8}")
+            continue
+        change = result["best"] / before["best"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{name:<24} {before['best'] * 1e6:10.2f}us"
+            f" {result['best'] * 1e6:10.2f}us {change:+8.1%}{flag}"
+        )
+    return regressed
+
+
+def _format(name: str, result: dict) -> str:
+    line = f"{name:<24} {result['best'] * 1e6:10.2f}us"
+    if "bus" in result:
+        line += f"  bus {result['bus'] * 1e6:8.2f}us ({result['frames']:.1f} frames)"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the spi_driver benchmarks")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative slowdown counted as regression (default 0.2)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--filter", default="", help="only run benchmarks containing this string"
+    )
+    args = parser.parse_args()
+
+    results = dict()
+    for name, benchmark in BENCHMARKS.items():
+        if args.filter in name:
+            results[name] = measure(benchmark, args.repeat)
+            if not args.compare:
+                print(_format(name, results[name]))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,2 @@
+from spi_driver.coordinator import SpiCoordinator
 from spi_driver.spi_registers import SpiRegisters
@@ -0,0 +1,174 @@
+import argparse
+import json
+import logging
+import os
+import time
+from typing import List, Optional, Sequence
+
+from spi_driver.spi_registers import SpiRegisters
+
+logger = logging.getLogger(__name__)
+
+# calibrated rates per board, /data is the persistent partition of the
+# board images
+DEFAULT_PATH = "/data/spi-calibration.json"
+
+# candidate clock rates, tested in increasing order
+RATES = [
+    500000,
+    1000000,
+    2000000,
+    4000000,
+    5000000,
+    8000000,
+    10000000,
+    12500000,
+    16000000,
+    20000000,
+    25000000,
+    31250000,
+]
+# the chosen rate is the highest candidate within margin times the highest
+# passing rate
+MARGIN = 0.75
+PATTERNS = [0x00, 0xFF, 0x55, 0xAA, 0xA5, 0x5A, 0x0F, 0xF0] + [1 << i for i in range(8)]
+# words per stream mode burst, long frames are more likely to show corruption
+BURST = 64
+
+
+def calibrate(
+    registers: SpiRegisters,
+    scratch_address: int,
+    rates: Sequence[int] = RATES,
+    margin: float = MARGIN,
+    repeats: int = 4,
+    allow_side_effects: bool = False,
+) -> int:
+    # writes and reads back test patterns through scratch_address, which must
+    # be a register reading back what was written. Rates are raised until a
+    # pattern is corrupted, the transport is left at the chosen rate and the
+    # scratch register at its original value.
+    #
+    # None of the FPGA designs has a scratch register, every read/write
+    # register drives hardware (motor direction and speed, hold bits, the
+    # crossbar select, stepper driver configuration). The patterns reach the
+    # hardware until the register is restored, so the caller has to confirm
+    # with allow_side_effects that the register is safe to toggle, e.g. with
+    # the motors unpowered.
+    if not allow_side_effects:
+        raise ValueError(
+            f"calibrating through register {scratch_address} writes test"
+            " patterns to the hardware it drives, pass allow_side_effects=True"
+            " if that is safe"
+        )
+    rates = sorted(rates)
+    highest: Optional[int] = None
+    with registers.exclusive_bus() as spi:
+        spi.max_speed_hz = rates[0]
+        original = _read(spi, scratch_address, 1)[0]
+        try:
+            for rate in rates:
+                spi.max_speed_hz = rate
+                if not _verify(spi, scratch_address, repeats):
+                    logger.info("SPI clock %d Hz corrupts data", rate)
+                    break
+                highest = rate
+        finally:
+            spi.max_speed_hz = rates[0]
+            _write(spi, scratch_address, [original])
+
+        if highest is None:
+            raise RuntimeError(f"no reliable SPI clock rate in {rates}")
+        chosen = max(
+            rate for rate in rates if rate <= highest * margin or rate == rates[0]
+        )
+        spi.max_speed_hz = chosen
+    logger.info("SPI clock reliable up to %d Hz, using %d Hz", highest, chosen)
+    return chosen
+
+
+def load_rate(board: str, path: str = DEFAULT_PATH) -> Optional[int]:
+    try:
+        with open(path) as file:
+            return json.load(file)[board]["max_speed_hz"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_rate(board: str, max_speed_hz: int, path: str = DEFAULT_PATH):
+    try:
+        with open(path) as file:
+            calibrations = json.load(file)
+    except (OSError, ValueError):
+        calibrations = dict()
+    calibrations[board] = {"max_speed_hz": max_speed_hz, "calibrated": time.time()}
+    # replace the file atomically, a torn file would lose every board
+    temporary = path + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(calibrations, file, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def _verify(spi, address: int, repeats: int) -> bool:
+    for _ in range(repeats):
+        for pattern in PATTERNS:
+            _write(spi, address, [pattern])
+            if _read(spi, address, 1) != [pattern]:
+                return False
+        # stream mode bursts repeat the register in every data word
+        _write(spi, address, [0xA5])
+        if _read(spi, address, BURST, stream=True) != [0xA5] * BURST:
+            return False
+    return True
+
+
+def _write(spi, address: int, data: List[int]):
+    spi.xfer2([0x80 + (address >> 8), address & 0xFF, *data])
+
+
+def _read(spi, address: int, count: int, stream: bool = False) -> List[int]:
+    config = 0x40 if stream else 0x00
+    return list(spi.xfer2([config + (address >> 8), address & 0xFF] + [0] * count)[2:])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Calibrates the SPI clock of a board and stores the rate."
+        " The calibration writes test patterns at every candidate rate to"
+        " scratch_address. The FPGA designs have no scratch register, every"
+        " read/write register drives hardware: motors may move and drivers"
+        " may be reconfigured until the register is restored. Only run it"
+        " with the hardware behind the register made safe."
+    )
+    parser.add_argument("board", help="name the rate is stored under")
+    parser.add_argument(
+        "scratch_address",
+        type=lambda value: int(value, 0),
+        help="address of a register that reads back what was written",
+    )
+    parser.add_argument(
+        "--allow-side-effects",
+        action="store_true",
+        required=True,
+        help="confirm that toggling scratch_address is safe for the hardware",
+    )
+    parser.add_argument("--bus", type=int, default=0)
+    parser.add_argument("--device", type=int, default=0)
+    parser.add_argument("--margin", type=float, default=MARGIN)
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    registers = SpiRegisters(bus=args.bus, device=args.device)
+    rate = calibrate(
+        registers,
+        args.scratch_address,
+        margin=args.margin,
+        allow_side_effects=args.allow_side_effects,
+    )
+    save_rate(args.board, rate, args.path)
+    print(f"{args.board}: {rate} Hz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from spi_driver.spi_registers import SpiRegisters, _Listeners, _ReadRun
+
+_Pending = Tuple[
+    float,
+    int,
+    SpiRegisters,
+    List[_ReadRun],
+    _Listeners,
+    threading.Event,
+]
+
+
+class SpiCoordinator:
+    # runs several SpiRegisters (e.g. one per bus or chip select) concurrently,
+    # each in its own transfer thread. The completed cycles of all instances
+    # are published on the event loop in the order of their timestamps.
+    # Cycles arriving within reorder_window seconds of each other are sorted
+    # even if they reach the loop in a different order, at the cost of
+    # delaying every cycle by that window.
+    def __init__(self, registers: Iterable[SpiRegisters], reorder_window: float = 0.0):
+        self.registers = list(registers)
+        self.reorder_window = reorder_window
+        self._pending: List[_Pending] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._drain_scheduled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def communicate_coroutine(self):
+        self._loop = asyncio.get_running_loop()
+        tasks = [
+            asyncio.create_task(registers._communicate_threaded(self._post))
+            for registers in self.registers
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _post(
+        self,
+        timestamp: float,
+        registers: SpiRegisters,
+        changed_runs: List[_ReadRun],
+        change_listeners: _Listeners,
+        published: threading.Event,
+    ):
+        # called from the transfer threads
+        pending = (
+            timestamp,
+            next(self._sequence),
+            registers,
+            changed_runs,
+            change_listeners,
+            published,
+        )
+        with self._lock:
+            heapq.heappush(self._pending, pending)
+            if self._drain_scheduled:
+                return
+            self._drain_scheduled = True
+        assert self._loop is not None
+        self._loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self):
+        horizon = time.monotonic() - self.reorder_window
+        ready = []
+        with self._lock:
+            while self._pending and self._pending[0][0] <= horizon:
+                ready.append(heapq.heappop(self._pending))
+            following = self._pending[0][0] if self._pending else None
+            self._drain_scheduled = following is not None
+        if following is not None and self._loop is not None:
+            self._loop.call_later(following - horizon, self._drain)
+
+        for timestamp, _, registers, changed_runs, change_listeners, published in ready:
+            try:
+                registers._publish(timestamp, changed_runs, change_listeners, published)
+            except Exception as exception:
+                published.set()
+                asyncio.get_running_loop().call_exception_handler(
+                    {
+                        "message": "Exception in SPI change callback",
+                        "exception": exception,
+                    }
+                )
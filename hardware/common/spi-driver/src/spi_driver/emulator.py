@@ -0,0 +1,93 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from spi_driver.transports import MemoryTransport
+
+# per-frame cost of the spidev ioctl and the chip-select setup and hold times,
+# a typical value for a Raspberry Pi
+CS_OVERHEAD = 15e-6
+
+
+class BusEmulator(MemoryTransport):
+    # register-level model of the GOLDi SPI bus adaptor
+    # (fpga/src/comms/goldi_spi/BUS_ADAPTOR.vhd). A frame is a 16 bit
+    # configuration word | WE | SE | TAG | ADR | followed by data words. Every
+    # data word accesses ADR, which is decremented after each word unless SE
+    # (stream enable) is set. The frame is decoded like by MemoryTransport,
+    # but addresses wrap around like the address counter of the FPGA.
+    #
+    # Reads answer from registers unless a read hook is installed for the
+    # address, writes store into registers unless the address is read-only or
+    # has a write hook. The timing model accumulates what the transferred
+    # frames would have cost on the wire at max_speed_hz. Above
+    # max_reliable_hz the received data is sampled one bit late, like on a
+    # cable too long for the clock rate.
+    def __init__(
+        self,
+        address_width: int = 10,
+        tag_bits: int = 4,
+        max_speed_hz: int = 5000000,
+        cs_overhead: float = CS_OVERHEAD,
+        read_only: Iterable[int] = (),
+        trace: bool = False,
+        max_reliable_hz: Optional[float] = None,
+    ):
+        super().__init__(1 << address_width)
+        self.address_width = address_width
+        self.tag_bits = tag_bits
+        self.max_speed_hz = max_speed_hz
+        self.cs_overhead = cs_overhead
+        self.max_reliable_hz = max_reliable_hz
+        self.read_only = set(read_only)
+        # address -> hook(tag) returning the register value
+        self.read_hooks: Dict[int, Callable[[int], int]] = dict()
+        # address -> hook(value, tag)
+        self.write_hooks: Dict[int, Callable[[int, int], None]] = dict()
+        # all transferred frames if trace is set
+        self.transactions: Optional[List[List[int]]] = [] if trace else None
+        self.reset_timing()
+
+    def reset_timing(self):
+        self.frames = 0
+        self.bytes = 0
+        self.bus_time = 0.0
+
+    def frame_time(self, length: int) -> float:
+        # wire time of a frame of length bytes including chip-select overhead
+        return self.cs_overhead + length * 8 / self.max_speed_hz
+
+    def xfer2(self, data: Sequence[int]) -> List[int]:
+        if self.transactions is not None:
+            self.transactions.append(list(data))
+        self.frames += 1
+        self.bytes += len(data)
+        self.bus_time += self.frame_time(len(data))
+
+        write, tag, address, step = self.decode(data)
+        mask = (1 << self.address_width) - 1
+
+        response = [0, 0]
+        for value in data[2:]:
+            if write:
+                write_hook = self.write_hooks.get(address)
+                if write_hook is not None:
+                    write_hook(value, tag)
+                elif address not in self.read_only:
+                    self.registers[address] = value
+                response.append(0)
+            else:
+                read_hook = self.read_hooks.get(address)
+                if read_hook is not None:
+                    response.append(read_hook(tag) & 0xFF)
+                else:
+                    response.append(self.registers[address])
+            address = (address - step) & mask
+
+        if (
+            self.max_reliable_hz is not None
+            and self.max_speed_hz > self.max_reliable_hz
+        ):
+            carry = 0
+            for i, value in enumerate(response):
+                response[i] = carry << 7 | value >> 1
+                carry = value & 1
+        return response
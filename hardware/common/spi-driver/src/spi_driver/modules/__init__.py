@@ -1,7 +1,10 @@
 from spi_driver.modules.bin_input import BinInput
 from spi_driver.modules.bin_output import BinOutput
 from spi_driver.modules.bit import Bit
+from spi_driver.modules.encoder import Encoder
 from spi_driver.modules.gpio import Gpio
+from spi_driver.modules.gpio_bank import GpioBank
 from spi_driver.modules.motor import Motor
 from spi_driver.modules.numeric import Numeric
 from spi_driver.modules.stepper_motor import StepperMotor
+from spi_driver.modules.subscription import Subscription
@@ -1,22 +1,30 @@
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from pyee.asyncio import AsyncIOEventEmitter
 
 from spi_driver.spi_registers import SpiRegisters
 
+# bit positions set in every byte value
+_SET_BITS = tuple(tuple(j for j in range(8) if value >> j & 1) for value in range(256))
+
 
 class BinInput(AsyncIOEventEmitter):
+    # emits "change" (name, value) for every signal and once per cycle
+    # "changes" (timestamp, [(name, value), ...]) with all transitions. With
+    # per_signal unset only "changes" is emitted.
     def __init__(
         self,
         registers: SpiRegisters,
         address: Union[int, List[int]],
         signalNames: Union[List[Union[str, None]], List[str]],
+        per_signal: bool = True,
+        period: Union[float, str, None] = None,
     ):
         super().__init__()
         self._registers = registers
         self._signalNames = signalNames
         self._signalIndex = {name: i for i, name in enumerate(signalNames)}
-        self._values: List[Optional[bool]] = [None] * len(signalNames)
+        self._per_signal = per_signal
         self._register_cnt = len(signalNames) // 8
         if isinstance(address, int):
             self._address = [
@@ -27,21 +35,81 @@ class BinInput(AsyncIOEventEmitter):
         else:
             self._address = address
         assert len(self._address) == self._register_cnt
+        self._register_index = {address: i for i, address in enumerate(self._address)}
 
+        # signal name of every bit, the bits of a register following an
+        # unnamed one are not decoded
+        self._names: List[Optional[str]] = [None] * (self._register_cnt * 8)
         for i in range(self._register_cnt):
-            self._registers.add_register(self._address[i], self._on_change)
+            for j in range(8):
+                name = signalNames[i * 8 + j]
+                if name is None:
+                    break
+                self._names[i * 8 + j] = name
+        # register values the signal states were decoded from
+        self._state = bytearray(self._register_cnt)
+        self._decoded = False
 
-    def _on_change(self, registers: SpiRegisters):
         for i in range(self._register_cnt):
-            address = self._address[i]
+            self._registers.add_register(
+                self._address[i], self._on_change, period, detailed=True
+            )
+
+    def _on_change(
+        self, registers: SpiRegisters, changes: Optional[Dict[int, int]] = None
+    ):
+        if not self._decoded:
+            self._decoded = True
+            if changes is None:
+                initial = self._decode_all(registers)
+                if initial:
+                    self._dispatch(registers, initial)
+                return
+            # the states before the first detailed change are the previous
+            # values of the changed registers and the current values of the
+            # others
+            for i, address in enumerate(self._address):
+                self._state[i] = changes.get(address, registers[address])
+
+        state = self._state
+        names = self._names
+        index = self._register_index
+        transitions: List[Tuple[str, bool]] = []
+        for address in self._address if changes is None else changes:
+            i = index[address]
+            value = registers[address]
+            flipped = value ^ state[i]
+            if not flipped:
+                continue
+            state[i] = value
+            base = i * 8
+            for j in _SET_BITS[flipped]:
+                name = names[base + j]
+                if name is not None:
+                    transitions.append((name, value >> j & 1 == 1))
+        if transitions:
+            self._dispatch(registers, transitions)
+
+    def _decode_all(self, registers: SpiRegisters) -> List[Tuple[str, bool]]:
+        # the first decode reports every signal
+        transitions = []
+        for i, address in enumerate(self._address):
             value = registers[address]
+            self._state[i] = value
             for j in range(8):
-                index = i * 8 + j
-                if index >= len(self._signalNames) or self._signalNames[index] is None:
+                name = self._names[i * 8 + j]
+                if name is None:
                     break
-                if self._values[index] != bool(value & (1 << j)):
-                    self._values[index] = bool(value & (1 << j))
-                    self.emit("change", self._signalNames[index], self._values[index])
+                transitions.append((name, value >> j & 1 == 1))
+        return transitions
+
+    def _dispatch(self, registers: SpiRegisters, transitions: List[Tuple[str, bool]]):
+        for name, value in transitions:
+            if self._per_signal:
+                self.emit("change", name, value)
+            registers.report_change(self, name, value)
+        if self.listeners("changes"):
+            self.emit("changes", registers.cycle_time, transitions)
 
     def __setitem__(self, key: str, value: Optional[bool]):
         raise NotImplementedError("BinInput is read-only")
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional, Union
 
 from pyee.asyncio import AsyncIOEventEmitter
 
@@ -6,20 +6,35 @@ from spi_driver.spi_registers import SpiRegisters
 
 
 class Bit(AsyncIOEventEmitter):
-    def __init__(self, registers: SpiRegisters, address: int, bit: int):
+    def __init__(
+        self,
+        registers: SpiRegisters,
+        address: int,
+        bit: int,
+        period: Union[float, str, None] = None,
+    ):
         super().__init__()
         self._registers = registers
         self._address = address
         self._bit = bit
         self._value: Optional[bool] = None
 
-        self._registers.add_register(self._address, self._on_change)
+        self._registers.add_register(
+            self._address, self._on_change, period, detailed=True
+        )
 
-    def _on_change(self, registers: SpiRegisters):
+    def _on_change(
+        self, registers: SpiRegisters, changes: Optional[Dict[int, int]] = None
+    ):
         value = registers.getBit(self._address, self._bit)
+        if self._value is None and changes is not None:
+            # the bit starts out with its previous value, changes of the other
+            # bits of the register are not reported
+            self._value = changes[self._address] >> self._bit & 1 == 1
         if self._value != value:
             self._value = value
             self.emit("change", self._value)
+            registers.report_change(self, None, value)
 
     def set(self, value: bool):
         self._registers.setBit(self._address, self._bit, value)
@@ -0,0 +1,198 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from pyee.asyncio import AsyncIOEventEmitter
+
+from spi_driver.modules.numeric import Numeric
+from spi_driver.spi_registers import SpiRegisters
+
+
+class Encoder(AsyncIOEventEmitter):
+    # motion state of a Numeric counter. Every change is stored with the
+    # timestamp of its SPI cycle in a ring buffer of samples entries, velocity
+    # (counts/s) and acceleration are estimated over the buffer. Between
+    # changes the speed is bounded by one count per elapsed time, so the
+    # counter is at rest once no count arrived for 1 / settled_speed seconds.
+    #
+    # Emits "moving" (velocity) when the speed rises above settled_speed and
+    # "settled" (position) when it falls below. While driven, "stalled"
+    # (position) is emitted once the speed stayed below stall_speed for
+    # stall_time seconds. The state follows the SPI cycles, the counter is not
+    # polled. Timers deliver the events between cycles while an event loop is
+    # running, without one the deadlines are checked on the next change.
+    def __init__(
+        self,
+        registers: SpiRegisters,
+        numeric: Numeric,
+        samples: int = 8,
+        settled_speed: float = 20.0,
+        stall_speed: Optional[float] = None,
+        stall_time: float = 0.1,
+    ):
+        super().__init__()
+        if samples < 2:
+            raise ValueError("at least two samples are needed")
+        self._registers = registers
+        self._numeric = numeric
+        self.settled_speed = settled_speed
+        self.stall_speed = settled_speed if stall_speed is None else stall_speed
+        self.stall_time = stall_time
+        self.moving = False
+        # (cycle timestamp, position)
+        self._samples: Deque[Tuple[float, int]] = deque(maxlen=samples)
+        self._driven = False
+        self._stalled = False
+        self._settle_timer: Optional[asyncio.TimerHandle] = None
+        self._stall_timer: Optional[asyncio.TimerHandle] = None
+        self._stall_deadline: Optional[float] = None
+
+        numeric.on("change", self._on_sample)
+
+    def value(self) -> int:
+        return self._numeric.value()
+
+    def velocity(self, now: Optional[float] = None) -> float:
+        samples = self._samples
+        if len(samples) < 2:
+            return 0.0
+        (first_time, first), (last_time, last) = samples[0], samples[-1]
+        if last_time <= first_time:
+            return 0.0
+        velocity = (last - first) / (last_time - first_time)
+        idle = (time.monotonic() if now is None else now) - last_time
+        if idle > 0 and abs(velocity) * idle > 1:
+            velocity = math.copysign(1 / idle, velocity)
+        return velocity
+
+    def acceleration(self) -> float:
+        # change between the mean velocities of both halves of the buffer
+        samples = list(self._samples)
+        if len(samples) < 3:
+            return 0.0
+        middle = len(samples) // 2
+        (t0, p0), (t1, p1), (t2, p2) = samples[0], samples[middle], samples[-1]
+        if not t0 < t1 < t2:
+            return 0.0
+        first = (p1 - p0) / (t1 - t0)
+        second = (p2 - p1) / (t2 - t1)
+        return (second - first) / ((t2 - t0) / 2)
+
+    def drive(self, driven: bool):
+        # set while the axis is driven, enables the stall detection
+        self._driven = driven
+        self._stalled = False
+        if driven:
+            self._update(time.monotonic())
+        else:
+            self._cancel_stall()
+
+    def reset(self):
+        # forgets the samples, e.g. after the counter was reset
+        self._samples.clear()
+
+    async def stopped(self) -> str:
+        # waits for the next "settled" or "stalled" event and returns its name
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+
+        def settled(position: int):
+            if not future.done():
+                future.set_result("settled")
+
+        def stalled(position: int):
+            if not future.done():
+                future.set_result("stalled")
+
+        self.on("settled", settled)
+        self.on("stalled", stalled)
+        # arms the timers of deadlines passed without a running loop
+        self._update(time.monotonic())
+        try:
+            return await future
+        finally:
+            self.remove_listener("settled", settled)
+            self.remove_listener("stalled", stalled)
+
+    def _on_sample(self, position: int):
+        timestamp = self._registers.cycle_time
+        samples = self._samples
+        # a count after a rest starts a new motion, older samples would
+        # only dilute its velocity
+        if samples and timestamp - samples[-1][0] > 1 / self.settled_speed:
+            last = samples[-1]
+            samples.clear()
+            samples.append(last)
+        samples.append((timestamp, position))
+        self._update(timestamp)
+
+    def _update(self, now: float):
+        speed = abs(self.velocity(now))
+        if speed > self.settled_speed:
+            if not self.moving:
+                self.moving = True
+                self.emit("moving", self.velocity(now))
+            if self._settle_timer is None:
+                # the speed bound falls below settled_speed once no count
+                # arrived for 1 / settled_speed seconds
+                rest = self._samples[-1][0] + 1.001 / self.settled_speed
+                self._settle_timer = _call_at(rest, self._on_settle_timer)
+        elif self.moving:
+            self.moving = False
+            if self._settle_timer is not None:
+                self._settle_timer.cancel()
+                self._settle_timer = None
+            self.emit("settled", self._position())
+
+        if not self._driven:
+            return
+        if speed >= self.stall_speed:
+            self._stalled = False
+            self._cancel_stall()
+        elif not self._stalled:
+            if self._stall_deadline is None:
+                self._stall_deadline = now + self.stall_time
+            if now >= self._stall_deadline:
+                self._stall()
+            elif self._stall_timer is None:
+                self._stall_timer = _call_at(self._stall_deadline, self._on_stall_timer)
+
+    def _on_settle_timer(self):
+        self._settle_timer = None
+        self._update(time.monotonic())
+
+    def _on_stall_timer(self):
+        self._stall_timer = None
+        if (
+            self._driven
+            and not self._stalled
+            and abs(self.velocity()) < self.stall_speed
+        ):
+            self._stall()
+
+    def _stall(self):
+        self._stalled = True
+        self._stall_deadline = None
+        self.emit("stalled", self._position())
+
+    def _cancel_stall(self):
+        self._stall_deadline = None
+        if self._stall_timer is not None:
+            self._stall_timer.cancel()
+            self._stall_timer = None
+
+    def _position(self) -> int:
+        if self._samples:
+            return self._samples[-1][1]
+        return self._numeric.value()
+
+
+def _call_at(deadline: float, callback) -> Optional[asyncio.TimerHandle]:
+    # timer calling callback at the monotonic time deadline, None without a
+    # running event loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return loop.call_later(max(0.0, deadline - time.monotonic()), callback)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional, Union
 
 from pyee.asyncio import AsyncIOEventEmitter
 
@@ -6,19 +6,33 @@ from spi_driver.spi_registers import SpiRegisters
 
 
 class Gpio(AsyncIOEventEmitter):
-    def __init__(self, registers: SpiRegisters, address: int):
+    def __init__(
+        self,
+        registers: SpiRegisters,
+        address: int,
+        period: Union[float, str, None] = None,
+    ):
         super().__init__()
         self._registers = registers
         self._address = address
         self._value: Optional[bool] = None
 
-        self._registers.add_register(self._address, self._on_change)
-
-    def _on_change(self, registers: SpiRegisters):
-        value = self._registers.getBit(self._address, 0)
+        self._registers.add_register(
+            self._address, self._on_change, period, detailed=True
+        )
+
+    def _on_change(
+        self, registers: SpiRegisters, changes: Optional[Dict[int, int]] = None
+    ):
+        value = registers.getBit(self._address, 0)
+        if self._value is None and changes is not None:
+            # the value starts out as bit 0 of the previous register value,
+            # output enable changes are not reported
+            self._value = changes[self._address] & 1 == 1
         if self._value != value:
             self._value = value
             self.emit("change", self._value)
+            registers.report_change(self, None, value)
 
     def set(self, value: bool):
         self._registers.setBit(self._address, 0, value)
@@ -0,0 +1,136 @@
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from pyee.asyncio import AsyncIOEventEmitter
+
+from spi_driver.spi_registers import SpiRegisters
+
+# channel values or output enables, by channel index or for the first channels
+ChannelValues = Union[Mapping[int, bool], Sequence[bool]]
+
+
+class GpioBank(AsyncIOEventEmitter):
+    # count GPIO channels in consecutive registers starting at address, each
+    # register holds the value in bit 0 and the output enable in bit 1 (see
+    # Gpio). The registers are read in one frame and decoded by a single
+    # callback per cycle. Emits "changes" (timestamp, [(index, value), ...])
+    # once per cycle, bank[index] is a view of a channel compatible with Gpio.
+    def __init__(
+        self,
+        registers: SpiRegisters,
+        address: int,
+        count: int,
+        period: Union[float, str, None] = None,
+    ):
+        super().__init__()
+        self._registers = registers
+        self._address = address
+        self._values: List[Optional[bool]] = [None] * count
+        # views are created on first access
+        self._channels: List[Optional[GpioChannel]] = [None] * count
+
+        for i in range(count):
+            self._registers.add_register(
+                address + i, self._on_change, period, detailed=True
+            )
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index: int) -> "GpioChannel":
+        channel = self._channels[index]
+        if channel is None:
+            channel = GpioChannel(self, range(len(self._values))[index])
+            self._channels[index] = channel
+        return channel
+
+    def __iter__(self) -> Iterator["GpioChannel"]:
+        return (self[i] for i in range(len(self._values)))
+
+    def _on_change(
+        self, registers: SpiRegisters, changes: Optional[Dict[int, int]] = None
+    ):
+        values = self._values
+        first = self._address
+        transitions: List[Tuple[int, bool]] = []
+        if changes is None:
+            for index in range(len(values)):
+                value = registers[first + index] & 1 == 1
+                if values[index] != value:
+                    values[index] = value
+                    transitions.append((index, value))
+        else:
+            # only the changed registers are compared, output enable changes
+            # are not reported. Channels not seen yet start out with their
+            # previous values.
+            for address in changes:
+                index = address - first
+                value = registers[address] & 1 == 1
+                if values[index] is None:
+                    values[index] = changes[address] & 1 == 1
+                if values[index] != value:
+                    values[index] = value
+                    transitions.append((index, value))
+        if not transitions:
+            return
+
+        channels = self._channels
+        for index, value in transitions:
+            channel = channels[index]
+            if channel is None:
+                channel = self[index]
+            else:
+                channel.emit("change", value)
+            registers.report_change(channel, None, value)
+        # emitting without listeners is not free
+        if self.listeners("changes"):
+            self.emit("changes", registers.cycle_time, transitions)
+
+    def setValues(self, values: ChannelValues):
+        # drives several channels, written in one burst
+        items = _items(values)
+        self._registers.setBits((self._address + i, 0, value) for i, value in items)
+        for index, value in items:
+            self._set_value(index, value)
+
+    def setOutputs(self, outputs: ChannelValues):
+        self._registers.setBits(
+            (self._address + i, 1, output) for i, output in _items(outputs)
+        )
+
+    def values(self) -> List[bool]:
+        return [
+            self._registers.getBit(self._address + i, 0)
+            for i in range(len(self._values))
+        ]
+
+    def _set_value(self, index: int, value: bool):
+        if self._values[index] != value:
+            self._values[index] = value
+            channel = self._channels[index]
+            if channel is not None:
+                channel.emit("change", value)
+
+
+class GpioChannel(AsyncIOEventEmitter):
+    # a single channel of a GpioBank with the interface of Gpio
+    def __init__(self, bank: GpioBank, index: int):
+        super().__init__()
+        self._bank = bank
+        self._index = index
+        self._address = bank._address + index
+
+    def set(self, value: bool):
+        self._bank._registers.setBit(self._address, 0, value)
+        self._bank._set_value(self._index, value)
+
+    def setOutput(self, value: bool):
+        self._bank._registers.setBit(self._address, 1, value)
+
+    def value(self) -> bool:
+        return self._bank._registers.getBit(self._address, 0)
+
+
+def _items(values: ChannelValues) -> List[Tuple[int, bool]]:
+    if isinstance(values, Mapping):
+        return list(values.items())
+    return list(enumerate(values))
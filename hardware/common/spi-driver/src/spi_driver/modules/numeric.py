@@ -1,46 +1,129 @@
-from typing import Literal, Optional
+from typing import Dict, Literal, Optional, Tuple, Union
 
 from pyee.asyncio import AsyncIOEventEmitter
 
 from spi_driver.spi_registers import SpiRegisters
 
+# range of extended positions
+POSITION_MIN = -(1 << 63)
+POSITION_MAX = (1 << 63) - 1
+
 
 class Numeric(AsyncIOEventEmitter):
+    # size bit value in consecutive registers, all bytes are read in the same
+    # frame. With signed set the value is two's complement. With extend set
+    # the value is the position of a wrapping counter extended to 64 bits,
+    # the counter must move by less than half its range between two cycles.
+    # Every wrap of the counter emits "wrap" with 1 (upwards) or -1.
     def __init__(
         self,
         registers: SpiRegisters,
         address: int,
         size: int = 16,
         endianess: Literal["big", "little"] = "little",
+        signed: bool = False,
+        extend: bool = False,
+        period: Union[float, str, None] = None,
     ):
         super().__init__()
+        if size <= 0 or size % 8:
+            raise ValueError("size must be a positive multiple of 8")
         self._registers = registers
         if endianess == "little":
             self._address = [address + i for i in range(size // 8)]
         else:
-            self._address = [address + size // 8 - i for i in range(size // 8)]
+            self._address = [address + size // 8 - 1 - i for i in range(size // 8)]
+        self._size = size
+        self._signed = signed
+        self._extend = extend
         self._value: Optional[int] = None
+        # value of the read registers, updated by the changed bytes only
+        self._decoded: Optional[int] = None
+        self._shifts = {address: i * 8 for i, address in enumerate(self._address)}
+        # counter value and position of the last extension
+        self._counter: Optional[int] = None
+        self._position = 0
 
-        for address in self._address:
-            self._registers.add_register(address, self._on_change)
+        self._registers.add_registers(
+            self._address, self._on_change, period, detailed=True
+        )
 
-    def _on_change(self, registers: SpiRegisters):
-        value = 0
-        for i, address in enumerate(self._address):
-            value |= registers[address] << (i * 8)
+    def _on_change(
+        self, registers: SpiRegisters, changes: Optional[Dict[int, int]] = None
+    ):
+        raw = self._decoded
+        if raw is None or changes is None:
+            raw = 0
+            for i, address in enumerate(self._address):
+                raw |= registers[address] << (i * 8)
+        else:
+            for address in changes:
+                shift = self._shifts[address]
+                raw = raw & ~(0xFF << shift) | registers[address] << shift
+        self._decoded = raw
+
+        value = self._convert(raw)
+        if self._extend:
+            value, wrap = self._extended(value)
+            self._counter = raw
+            self._position = value
+            if wrap:
+                self.emit("wrap", wrap)
         if self._value != value:
             self._value = value
             self.emit("change", self._value)
+            registers.report_change(self, None, value)
 
     def set(self, value: int):
-        for i, address in enumerate(self._address):
-            self._registers[address] = (value >> (i * 8)) & 0xFF
+        if self._extend:
+            if not POSITION_MIN <= value <= POSITION_MAX:
+                raise ValueError("value exceeds 64 bits")
+        else:
+            low = -(1 << (self._size - 1)) if self._signed else 0
+            if not low <= value < low + (1 << self._size):
+                raise ValueError(f"value does not fit into {self._size} bits")
+        raw = value & ((1 << self._size) - 1)
+        # all bytes are sent with the same flush
+        self._registers.setBytes(
+            {
+                address: (raw >> (i * 8)) & 0xFF
+                for i, address in enumerate(self._address)
+            }
+        )
+        if self._extend:
+            self._counter = raw
+            self._position = value
         if self._value != value:
             self._value = value
             self.emit("change", self._value)
 
     def value(self) -> int:
-        value = 0
+        raw = 0
         for i, address in enumerate(self._address):
-            value |= self._registers[address] << (i * 8)
+            raw |= self._registers[address] << (i * 8)
+        value = self._convert(raw)
+        if self._extend:
+            value, _ = self._extended(value)
         return value
+
+    def _convert(self, raw: int) -> int:
+        if self._signed and raw >> (self._size - 1):
+            return raw - (1 << self._size)
+        return raw
+
+    def _extended(self, value: int) -> Tuple[int, int]:
+        # position for the converted counter value and the direction of a wrap
+        # since the last extension, 0 if the counter did not wrap
+        if self._counter is None:
+            return value, 0
+        half = 1 << (self._size - 1)
+        previous = self._convert(self._counter)
+        # shortest distance between the counter values
+        delta = (value - previous + half) % (1 << self._size) - half
+        position = self._position + delta
+        if not POSITION_MIN <= position <= POSITION_MAX:
+            raise OverflowError("extended position exceeds 64 bits")
+        wrap = 0
+        if value - previous != delta:
+            wrap = 1 if delta > 0 else -1
+        return position, wrap
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Callable, Optional, Tuple
+
+
+class Subscription:
+    # event handler wrapper applying subscriber-side policies to the events
+    # of a single signal, the last argument of an event is its value:
+    #
+    #   encoder.on("change", Subscription(handler, max_rate=20, deadband=2))
+    #
+    # min_delta drops values closer than min_delta to the last delivered one.
+    # deadband drops changes reversing the direction of the last delivered
+    # change by no more than deadband, like encoder jitter. With max_rate the
+    # handler is called at most max_rate times per second, events in between
+    # are coalesced and the latest one is delivered at the end of the
+    # interval.
+    def __init__(
+        self,
+        handler: Callable[..., Any],
+        max_rate: Optional[float] = None,
+        min_delta: Optional[float] = None,
+        deadband: Optional[float] = None,
+    ):
+        self.handler = handler
+        self.interval = 1 / max_rate if max_rate else 0.0
+        self.min_delta = min_delta
+        self.deadband = deadband
+        self._delivered: Optional[Any] = None
+        self._direction = 0
+        self._last_call = float("-inf")
+        self._pending: Optional[Tuple[Any, ...]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def __call__(self, *args: Any):
+        if not self._accept(args[-1]):
+            # the value returned close to the delivered one
+            self._pending = None
+            return
+        if not self.interval:
+            self._deliver(args)
+            return
+        loop = asyncio.get_running_loop()
+        due = self._last_call + self.interval
+        if self._timer is None and loop.time() >= due:
+            self._deliver(args)
+            return
+        self._pending = args
+        if self._timer is None:
+            self._timer = loop.call_at(due, self._on_timer)
+
+    def close(self):
+        # drops a coalesced event that was not delivered yet
+        self._pending = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _accept(self, value: Any) -> bool:
+        if self._delivered is None:
+            return True
+        delta = value - self._delivered
+        if self.min_delta is not None and abs(delta) < self.min_delta:
+            return False
+        if (
+            self.deadband is not None
+            and delta * self._direction < 0
+            and abs(delta) <= self.deadband
+        ):
+            return False
+        return True
+
+    def _on_timer(self):
+        self._timer = None
+        if self._pending is not None:
+            args = self._pending
+            self._pending = None
+            self._deliver(args)
+
+    def _deliver(self, args: Tuple[Any, ...]):
+        value = args[-1]
+        if self._delivered is not None and value != self._delivered:
+            self._direction = 1 if value > self._delivered else -1
+        self._delivered = value
+        self._last_call = asyncio.get_running_loop().time() if self.interval else 0.0
+        self.handler(*args)
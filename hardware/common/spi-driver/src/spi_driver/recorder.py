@@ -0,0 +1,153 @@
+import mmap
+import struct
+import time
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from spi_driver.transports import Transport
+
+# log layout: a header followed by one record per transaction, every record
+# is a fixed-size head (timestamp, direction, address, payload length) and the
+# payload. Reads store the received data words, writes the transmitted ones.
+# The STREAM flag of the direction marks stream mode frames, all of their
+# data words access the same register.
+MAGIC = b"GSPI"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+RECORD = struct.Struct("<dBHH")
+
+READ = 0
+WRITE = 1
+STREAM = 0x02
+
+
+class Transaction(NamedTuple):
+    timestamp: float
+    direction: int
+    address: int
+    payload: bytes
+    stream: bool = False
+
+    @property
+    def span(self) -> int:
+        # number of registers covered by the payload
+        return 1 if self.stream else len(self.payload)
+
+
+class SpiRecorder(Transport):
+    # wraps a transport and appends every xfer2 to a binary log
+    def __init__(self, spi: Transport, path: str):
+        self.spi = spi
+        self._file: Optional[BinaryIO] = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0))
+
+    def __getattr__(self, name: str):
+        return getattr(self.spi, name)
+
+    @property  # type: ignore[override]
+    def max_speed_hz(self) -> int:
+        return self.spi.max_speed_hz
+
+    @max_speed_hz.setter
+    def max_speed_hz(self, max_speed_hz: int):
+        self.spi.max_speed_hz = max_speed_hz
+
+    def xfer2(self, data: Sequence[int]) -> List[int]:
+        response = self.spi.xfer2(data)
+        if self._file is not None:
+            # without the write and stream enable bits
+            address = ((data[0] & 0x3F) << 8) | data[1]
+            if data[0] & 0x80:
+                direction, payload = WRITE, bytes(data[2:])
+            else:
+                direction, payload = READ, bytes(response[2:])
+            if data[0] & 0x40:
+                direction |= STREAM
+            self._file.write(RECORD.pack(time.time(), direction, address, len(payload)))
+            self._file.write(payload)
+        return response
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_log(path: str) -> Iterator[Transaction]:
+    with open(path, "rb") as file:
+        if file.seek(0, 2) < HEADER.size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as log:
+            magic, version, _ = HEADER.unpack_from(log, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a SPI transaction log")
+            offset = HEADER.size
+            while offset + RECORD.size <= len(log):
+                timestamp, direction, address, length = RECORD.unpack_from(log, offset)
+                start = offset + RECORD.size
+                offset = start + length
+                yield Transaction(
+                    timestamp,
+                    direction & ~STREAM,
+                    address,
+                    log[start:offset],
+                    bool(direction & STREAM),
+                )
+
+
+class ReplaySpiDev(Transport):
+    # transport answering reads from a recorded log. The recorded reads
+    # are applied to a register image in order, every read frame advances the
+    # log to the next recorded read covering its address and is answered from
+    # the image, so the replayed SpiRegisters may use a different transfer
+    # plan than the recorded one. Writes are not checked against the log.
+    def __init__(self, path: str, realtime: bool = False):
+        self.realtime = realtime
+        self.registers = bytearray(32768)
+        self._reads = [t for t in read_log(path) if t.direction == READ]
+        self._position = 0
+        # monotonic time and log timestamp of the first replayed read
+        self._origin: Optional[Tuple[float, float]] = None
+
+    @property
+    def exhausted(self) -> bool:
+        return self._position >= len(self._reads)
+
+    def xfer2(self, data: Sequence[int]) -> List[int]:
+        address = ((data[0] & 0x3F) << 8) | data[1]
+        count = len(data) - 2
+        # stream reads repeat the same register
+        step = 0 if data[0] & 0x40 else 1
+        if data[0] & 0x80:
+            return [0] * len(data)
+
+        for i in range(self._position, len(self._reads)):
+            read = self._reads[i]
+            if read.address - read.span < address <= read.address:
+                self._advance(i + 1)
+                break
+        else:
+            self._advance(len(self._reads))
+        return [0, 0, *[self.registers[address - i * step] for i in range(count)]]
+
+    def _advance(self, position: int):
+        for i in range(self._position, position):
+            transaction = self._reads[i]
+            if transaction.stream:
+                # the last data word is the latest value of the register
+                if transaction.payload:
+                    self.registers[transaction.address] = transaction.payload[-1]
+                continue
+            for offset, value in enumerate(transaction.payload):
+                self.registers[transaction.address - offset] = value
+        if self.realtime and position > self._position:
+            self._wait(self._reads[position - 1].timestamp)
+        self._position = position
+
+    def _wait(self, timestamp: float):
+        # keeps the recorded spacing between the replayed reads
+        if self._origin is None:
+            self._origin = (time.monotonic(), timestamp)
+        started, first = self._origin
+        delay = started + timestamp - first - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,244 @@
+import asyncio
+import inspect
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from spi_driver import modules
+from spi_driver.calibration import load_rate
+from spi_driver.spi_registers import SpiRegisters
+
+# register map of a board, one JSON file per board:
+#
+#   {
+#     "board": "warehouse_v2",
+#     "modules": {
+#       "hold_x": {"type": "Bit", "address": 1, "bit": 2},
+#       "XEncoder": {"type": "Numeric", "address": 9, "size": 16,
+#                    "period": "fast"},
+#       "XMotion": {"type": "Encoder", "numeric": "XEncoder"}
+#     },
+#     "init": [{"address": 18, "data": ["0x09", "0x45", "0x57"]}]
+#   }
+#
+# Every module entry names a class of spi_driver.modules, the other keys are
+# its constructor parameters, e.g. the poll class or period of its registers.
+# Parameters referring to a module take the name of an earlier entry. The
+# init writes are sent once after the modules are built.
+
+MODULES = {
+    name: getattr(modules, name)
+    for name in [
+        "BinInput",
+        "BinOutput",
+        "Bit",
+        "Encoder",
+        "Gpio",
+        "GpioBank",
+        "Motor",
+        "Numeric",
+        "StepperMotor",
+    ]
+}
+# parameters naming an earlier module instead of a value
+REFERENCES = {"Encoder": ("numeric",)}
+# constructor signatures the parameters are checked against
+_SIGNATURES = {name: inspect.signature(module) for name, module in MODULES.items()}
+
+
+class RegisterMap:
+    def __init__(
+        self,
+        board: str,
+        modules: List[Tuple[str, str, Dict[str, Any]]],
+        init: List[Tuple[int, List[int]]],
+    ):
+        self.board = board
+        # (name, type, parameters) in declaration order
+        self.modules = modules
+        # (address, data) of the init writes
+        self.init = init
+
+    def build(self, registers: SpiRegisters, target: Any = None) -> Any:
+        # constructs the modules as attributes of target, sends the init
+        # writes and builds the read plans of the registered poll groups
+        if target is None:
+            target = SimpleNamespace()
+        built: Dict[str, Any] = dict()
+        for name, type, parameters in self.modules:
+            parameters = dict(parameters)
+            for key in REFERENCES.get(type, ()):
+                parameters[key] = built[parameters[key]]
+            built[name] = MODULES[type](registers, **parameters)
+            setattr(target, name, built[name])
+        for address, data in self.init:
+            registers.write(address, data)
+        registers.precompute_plans()
+        return target
+
+    @classmethod
+    def open(
+        cls,
+        path: str,
+        target: Any,
+        registers: Optional[SpiRegisters] = None,
+        threaded: bool = True,
+    ) -> SpiRegisters:
+        # loads the register map at path, builds it as attributes of target
+        # and starts the communication task of registers. Without registers
+        # the bus is opened at the calibrated clock rate of the board (see
+        # spi_driver.calibration). Call it from a running event loop.
+        register_map = load_map(path)
+        if registers is None:
+            registers = SpiRegisters(
+                max_speed_hz=load_rate(register_map.board) or 5000000
+            )
+        register_map.build(registers, target)
+        registers.snapshot()
+        asyncio.create_task(registers.communicate_coroutine(threaded=threaded))
+        return registers
+
+
+def compile_map(source: Dict[str, Any]) -> RegisterMap:
+    # validates a parsed register map, raises ValueError for unknown types,
+    # invalid parameters and modules claiming the same register bits
+    board = source.get("board")
+    if not isinstance(board, str):
+        raise ValueError("register map without board name")
+    compiled: List[Tuple[str, str, Dict[str, Any]]] = []
+    # register address -> (claimed bit mask, name of the first claiming module)
+    claims: Dict[int, Tuple[int, str]] = dict()
+    types: Dict[str, str] = dict()
+    for name, entry in source.get("modules", {}).items():
+        if not isinstance(entry, dict):
+            raise ValueError(f"{name}: module entry must be an object")
+        parameters = dict(entry)
+        type = parameters.pop("type", None)
+        if type not in MODULES:
+            raise ValueError(f"{name}: unknown module type {type!r}")
+        references = REFERENCES.get(type, ())
+        for key in references:
+            if parameters.get(key) not in types:
+                raise ValueError(f"{name}: {key} must name an earlier module")
+        _check_period(name, parameters.get("period"))
+        try:
+            # registers is the first parameter of every module
+            _SIGNATURES[type].bind(None, **parameters)
+        except TypeError as error:
+            raise ValueError(f"{name}: {error}") from None
+        _check_parameters(name, parameters)
+        for address, mask in _claims(type, parameters):
+            if not 0 <= address < SpiRegisters.ADDRESS_SPACE:
+                raise ValueError(f"{name}: register address {address} out of range")
+            claimed, owner = claims.get(address, (0, name))
+            if claimed & mask:
+                raise ValueError(f"{name}: register {address} is claimed by {owner}")
+            claims[address] = (claimed | mask, owner)
+        types[name] = type
+        compiled.append((name, type, parameters))
+
+    init = []
+    for write in source.get("init", []):
+        data = [_byte(value) for value in write["data"]]
+        init.append((int(write["address"]), data))
+    return RegisterMap(board, compiled, init)
+
+
+def load_map(path: str) -> RegisterMap:
+    # loads and compiles the register map at path
+    with open(path) as file:
+        return compile_map(json.load(file))
+
+
+def _claims(type: str, parameters: Dict[str, Any]) -> List[Tuple[int, int]]:
+    # (address, bit mask) of the registers a module reads or writes
+    if type == "Bit":
+        return [(parameters["address"], 1 << parameters["bit"])]
+    if type == "Gpio":
+        return [(parameters["address"], 0xFF)]
+    if type == "GpioBank":
+        address = parameters["address"]
+        return [(address + i, 0xFF) for i in range(parameters["count"])]
+    if type == "Numeric":
+        address = parameters["address"]
+        return [(address + i, 0xFF) for i in range(parameters.get("size", 16) // 8)]
+    if type == "Motor":
+        return [
+            (parameters["direction_address"], 0xFF),
+            (parameters["speed_address"], 0xFF),
+        ]
+    if type == "StepperMotor":
+        # 16 bit speed, low byte first
+        speed_address = parameters["speed_address"]
+        return [
+            (parameters["direction_address"], 0xFF),
+            (speed_address, 0xFF),
+            (speed_address + 1, 0xFF),
+        ]
+    if type in ("BinInput", "BinOutput"):
+        address = parameters["address"]
+        names = parameters["signalNames"]
+        if isinstance(address, int):
+            # registers starting with an unnamed signal are skipped
+            address = [
+                address + i for i in range(len(names) // 8) if names[i * 8] is not None
+            ]
+        return [(a, 0xFF) for a in address]
+    return []
+
+
+# integer parameters of the modules and their smallest values
+_INTEGERS = {
+    "address": 0,
+    "direction_address": 0,
+    "speed_address": 0,
+    "bit": 0,
+    "count": 1,
+    "size": 8,
+}
+
+
+def _check_parameters(name: str, parameters: Dict[str, Any]):
+    # checks the parameter types and ranges the register claims depend on
+    for key, least in _INTEGERS.items():
+        if key not in parameters:
+            continue
+        value = parameters[key]
+        # BinInput and BinOutput take a list of register addresses as well
+        values = value if key == "address" and isinstance(value, list) else [value]
+        for value in values:
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError(f"{name}: {key} must be an integer, not {value!r}")
+            if value < least:
+                raise ValueError(f"{name}: {key} {value} is less than {least}")
+    if parameters.get("bit", 0) > 7:
+        raise ValueError(f"{name}: bit {parameters['bit']} out of range 0..7")
+    if parameters.get("size", 8) % 8:
+        raise ValueError(f"{name}: size {parameters['size']} is not a multiple of 8")
+    names = parameters.get("signalNames")
+    if names is not None:
+        if not isinstance(names, list) or len(names) % 8:
+            raise ValueError(
+                f"{name}: signalNames must be a list of 8 names per register"
+            )
+        address = parameters.get("address")
+        if isinstance(address, list) and len(address) != len(names) // 8:
+            raise ValueError(f"{name}: one address per 8 signalNames expected")
+
+
+def _check_period(name: str, period: Any):
+    if period is None:
+        return
+    if isinstance(period, str):
+        if period not in SpiRegisters.POLL_CLASSES:
+            raise ValueError(f"{name}: unknown poll class {period!r}")
+    elif not isinstance(period, (int, float)) or period <= 0:
+        raise ValueError(f"{name}: period must be a poll class or positive")
+
+
+def _byte(value: Any) -> int:
+    # data words are numbers or strings like "0x45"
+    byte = int(value, 0) if isinstance(value, str) else int(value)
+    if not 0 <= byte <= 0xFF:
+        raise ValueError(f"init data {value!r} is not a byte")
+    return byte
@@ -1,82 +1,823 @@
 import asyncio
-from typing import Callable, List, Optional, Set
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
-import spidev
+from spi_driver.recorder import SpiRecorder
+from spi_driver.stats import SpiStatistics
+from spi_driver.transports import SpidevTransport, Transport
+
+logger = logging.getLogger(__name__)
 
 
 class SpiRegisters:
+    # cost of opening an additional frame (configuration word and chip-select
+    # turnaround) expressed in data words, gaps up to this size are bridged
+    FRAME_OVERHEAD = 3
+    ADDRESS_SPACE = 32768
+    # polling periods in seconds, registers without a period are polled in
+    # every cycle
+    POLL_CLASSES = {"fast": 0.001, "normal": 0.01, "slow": 1.0}
+    # longest read frame in data words, longer runs of the read plans and
+    # snapshots are split
+    READ_BURST = 256
+    # largest gap between snapshot addresses read through instead of opening
+    # a new frame
+    SNAPSHOT_GAP = 32
+
+    # read buffers only extend up to the highest registered read address, the
+    # write buffer only holds addresses that have been written
     _read_buffer: bytearray
-    _write_buffer: bytearray
-    _register_read_addresses: Set[int]
+    _back_buffer: bytearray
+    _write_buffer: Dict[int, int]
+    # read address -> polling period, 0 for every cycle
+    _register_read_addresses: Dict[int, float]
     _register_write_addresses: Set[int]
-    _register_on_change_callbacks: List[List[Callable[["SpiRegisters"], None]]]
+    # address -> addresses always polled together with it
+    _register_groups: Dict[int, Tuple[int, ...]]
+    _register_on_change_callbacks: Dict[
+        int, Tuple[Callable[["SpiRegisters"], None], ...]
+    ]
+    _register_detailed_callbacks: Dict[int, Tuple["_DetailedCallback", ...]]
+    _changes_listeners: List["_ChangesListener"]
+    _cycle_changes: List["_Change"]
+    _read_plans: Dict[Tuple[int, ...], List["_ReadRun"]]
+    _poll_divisors: Optional[List[int]]
+    _lock: threading.Lock
+    _bus_lock: threading.Lock
+    _flush_waiters: List["asyncio.Future[None]"]
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _wake_writer: Optional[Callable[[], None]]
 
-    def __init__(self):
-        self.spi = spidev.SpiDev()
-        self.spi.open(0, 0)
-        self.spi.max_speed_hz = 5000000
+    def __init__(
+        self,
+        period: float = 0.05,
+        write_delay: float = 0.0,
+        log_interval: Optional[float] = None,
+        transport: Optional[Transport] = None,
+        bus: int = 0,
+        device: int = 0,
+        max_speed_hz: int = 5000000,
+    ):
+        self._period = period
+        # dirty registers wake the transfer loop after write_delay seconds,
+        # writes made within that window (or the same event loop iteration)
+        # are sent together
+        self.write_delay = write_delay
+        # log a statistics summary every log_interval seconds, time every
+        # callback individually if profile_callbacks is set
+        self.log_interval = log_interval
+        self.profile_callbacks = False
+        self.statistics = SpiStatistics()
+        self._cycle_xfers = 0
+        self._cycle_bytes = 0
+        self._last_log = time.monotonic()
+        # without a transport the spidev device of bus and chip select device
+        # is opened
+        if transport is None:
+            transport = SpidevTransport(bus, device, max_speed_hz)
+        self.spi = transport
 
-        self._register_on_change_callbacks = [[] for _ in range(32768)]
-        self._read_buffer = bytearray(32768)
-        self._write_buffer = bytearray(32768)
-        self._register_read_addresses = set()
+        self._register_on_change_callbacks = dict()
+        self._register_detailed_callbacks = dict()
+        # module transitions reported while a cycle is published, handed to
+        # the changes listeners together once all callbacks ran. cycle_time
+        # is the time.monotonic() timestamp of the cycle being published.
+        self._changes_listeners = []
+        self._cycle_changes = []
+        self.cycle_time = 0.0
+        self._read_buffer = bytearray()
+        self._back_buffer = bytearray()
+        self._write_buffer = dict()
+        self._register_read_addresses = dict()
+        self._register_groups = dict()
         self._register_write_addresses = set()
+        self._read_plans = dict()
+        self._poll_divisors = None
+        self._cycle = 0
+        self._merged_cycles = 0
+        self.reset_timing()
+        # _lock guards the write buffer and the registration state against
+        # the transfer thread, _bus_lock serializes access to the SpiDev
+        self._lock = threading.Lock()
+        self._bus_lock = threading.Lock()
+        self._flush_waiters = []
+        self._writes_in_flight = False
+        self._loop = None
+        self._wake_writer = None
+
+    @property
+    def period(self) -> float:
+        return self._period
+
+    @period.setter
+    def period(self, period: float):
+        with self._lock:
+            self._period = period
+            self._read_plans.clear()
+            self._poll_divisors = None
+
+    def stats(self) -> dict:
+        return {
+            "period": self._period,
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped_cycles": self.skipped_cycles,
+            "max_jitter": self.max_jitter,
+            "mean_jitter": self.mean_jitter,
+            "worst_cycle_time": self.worst_cycle_time,
+            **self.statistics.as_dict(),
+        }
+
+    def reset_stats(self):
+        self.reset_timing()
+        self.statistics = SpiStatistics()
+
+    @property
+    def mean_jitter(self) -> float:
+        return self._jitter_sum / self.cycles if self.cycles else 0.0
+
+    def reset_timing(self):
+        # scheduler statistics: cycles run, cycles that overran the next
+        # deadline, deadlines skipped because of overruns, worst lateness of a
+        # cycle start and worst duration of a cycle, in seconds
+        self.cycles = 0
+        self.overruns = 0
+        self.skipped_cycles = 0
+        self.max_jitter = 0.0
+        self.worst_cycle_time = 0.0
+        self._jitter_sum = 0.0
 
     def add_register(
         self,
         register_address: int,
-        on_change: Optional[Callable[["SpiRegisters"], None]] = None,
+        on_change: Optional[Callable[..., None]] = None,
+        period: Union[float, str, None] = None,
+        detailed: bool = False,
     ):
-        if on_change is not None:
-            self._register_on_change_callbacks[register_address].append(on_change)
-        self._register_read_addresses.add(register_address)
+        # detailed callbacks are called as on_change(registers, changes), where
+        # changes maps the addresses of the callback that changed in the cycle
+        # to their previous values
+        if not 0 <= register_address < self.ADDRESS_SPACE:
+            raise IndexError("register address out of range")
+        if isinstance(period, str):
+            period = self.POLL_CLASSES[period]
+        with self._lock:
+            if on_change is not None:
+                if detailed:
+                    table: Dict[int, Tuple[Callable[..., None], ...]] = (
+                        self._register_detailed_callbacks
+                    )
+                else:
+                    table = self._register_on_change_callbacks
+                table[register_address] = (*table.get(register_address, ()), on_change)
+            group = self._register_groups.get(register_address, (register_address,))
+            if group[-1] >= len(self._read_buffer):
+                padding = bytes(group[-1] + 1 - len(self._read_buffer))
+                self._read_buffer.extend(padding)
+                self._back_buffer.extend(padding)
+            # an address registered with several periods is polled at the
+            # fastest one, as is the rest of its group
+            read_addresses = self._register_read_addresses
+            period = min(
+                read_addresses.get(register_address, float("inf")), period or 0.0
+            )
+            for address in group:
+                read_addresses[address] = min(
+                    read_addresses.get(address, float("inf")), period
+                )
+            self._read_plans.clear()
+            self._poll_divisors = None
+
+    def add_registers(
+        self,
+        register_addresses: Sequence[int],
+        on_change: Optional[Callable[..., None]] = None,
+        period: Union[float, str, None] = None,
+        detailed: bool = False,
+    ):
+        # registers consecutive addresses that are always polled together,
+        # they are read in the same frame in every cycle, e.g. the bytes of a
+        # wide value
+        addresses = tuple(sorted(register_addresses))
+        if any(b - a != 1 for a, b in zip(addresses, addresses[1:])):
+            raise ValueError("register addresses must be consecutive")
+        if addresses and not 0 <= addresses[0] <= addresses[-1] < self.ADDRESS_SPACE:
+            raise IndexError("register address out of range")
+        with self._lock:
+            for address in addresses:
+                group = {*self._register_groups.get(address, ()), *addresses}
+                self._register_groups[address] = tuple(sorted(group))
+        for address in addresses:
+            self.add_register(address, on_change, period, detailed)
+
+    def add_changes_listener(self, listener: "_ChangesListener"):
+        # listener(timestamp, changes) is called once per cycle with the
+        # (module, name, value) transitions reported by the modules
+        self._changes_listeners.append(listener)
+
+    def remove_changes_listener(self, listener: "_ChangesListener"):
+        self._changes_listeners.remove(listener)
+
+    def report_change(self, source: object, name: Optional[str], value: object):
+        # called by the modules for every transition they emit in a cycle
+        if self._changes_listeners:
+            self._cycle_changes.append((source, name, value))
 
     def __getitem__(self, key: int):
-        return self._read_buffer[key]
+        if key < len(self._read_buffer):
+            return self._read_buffer[key]
+        if not 0 <= key < self.ADDRESS_SPACE:
+            raise IndexError("register address out of range")
+        return 0
 
     def getBit(self, key: int, bit: int) -> bool:
-        return self._read_buffer[key] & (1 << bit) != 0
+        return self[key] & (1 << bit) != 0
 
     def __setitem__(self, key: int, value: int):
-        self._register_write_addresses.add(key)
-        self._write_buffer[key] = value
+        if not 0 <= key < self.ADDRESS_SPACE:
+            raise IndexError("register address out of range")
+        if not 0 <= value < 256:
+            raise ValueError("byte must be in range(0, 256)")
+        with self._lock:
+            self._mark_dirty(key)
+            self._write_buffer[key] = value
 
     def setBit(self, key: int, bit: int, value: bool):
-        if value:
-            self._write_buffer[key] |= 1 << bit
+        if not 0 <= key < self.ADDRESS_SPACE:
+            raise IndexError("register address out of range")
+        with self._lock:
+            current = self._write_buffer.get(key, 0)
+            if value:
+                self._write_buffer[key] = current | 1 << bit
+            else:
+                self._write_buffer[key] = current & ~(1 << bit)
+            self._mark_dirty(key)
+
+    def snapshot(self, addresses: Iterable[int] = ()):
+        # reads the registered addresses and addresses (e.g. readable output
+        # registers) in a few bursts. The read buffers and the write shadow of
+        # setBit are seeded with the values without calling any callbacks, so
+        # the first cycle only reports actual changes. Call it before the
+        # first cycle.
+        with self._lock:
+            wanted = set(self._register_read_addresses).union(addresses)
+        values: Dict[int, int] = dict()
+        frames = 0
+        transferred_bytes = 0
+        with self._bus_lock:
+            for first, end in _runs(wanted, self.SNAPSHOT_GAP, self.READ_BURST):
+                frame = [
+                    ((end - 1) >> 8) & 0xFF,
+                    (end - 1) & 0xFF,
+                    *[0] * (end - first),
+                ]
+                data = self.spi.xfer2(frame)[:1:-1]
+                values.update(zip(range(first, end), data))
+                frames += 1
+                transferred_bytes += len(frame)
+        self.statistics.total_xfers += frames
+        self.statistics.total_bytes += transferred_bytes
+
+        with self._lock:
+            read_buffer = self._read_buffer
+            back_buffer = self._back_buffer
+            for address in wanted:
+                value = values[address]
+                if address < len(read_buffer):
+                    read_buffer[address] = value
+                    back_buffer[address] = value
+                # written values are not replaced
+                self._write_buffer.setdefault(address, value)
+
+    def setBytes(self, values: Mapping[int, int]):
+        # writes several registers at once, they are sent with the same flush
+        for key, value in values.items():
+            if not 0 <= key < self.ADDRESS_SPACE:
+                raise IndexError("register address out of range")
+            if not 0 <= value < 256:
+                raise ValueError("byte must be in range(0, 256)")
+        with self._lock:
+            for key, value in values.items():
+                self._mark_dirty(key)
+                self._write_buffer[key] = value
+
+    def setBits(self, bits: Iterable[Tuple[int, int, bool]]):
+        # sets (address, bit, value) bits at once, they are sent with the
+        # same flush
+        bits = list(bits)
+        for key, _, _ in bits:
+            if not 0 <= key < self.ADDRESS_SPACE:
+                raise IndexError("register address out of range")
+        with self._lock:
+            buffer = self._write_buffer
+            for key, bit, value in bits:
+                current = buffer.get(key, 0)
+                if value:
+                    buffer[key] = current | 1 << bit
+                else:
+                    buffer[key] = current & ~(1 << bit)
+                self._mark_dirty(key)
+
+    def write(self, address: int, data: Sequence[int]):
+        # immediate multi-register write: data[0] is stored at address, the
+        # following words at decreasing addresses. The write buffer is not
+        # touched, as init sequences may target paged registers.
+        with self._bus_lock:
+            self._write_frame(address, data)
+
+    @contextmanager
+    def exclusive_bus(self) -> Iterator[Transport]:
+        # holds the bus for raw transfers on the returned transport, the
+        # cycles and writes wait until the block is left
+        with self._bus_lock:
+            yield self.spi
+
+    def record(self, path: str):
+        # appends every following transaction to a binary log at path, see
+        # spi_driver.recorder
+        with self._bus_lock:
+            if isinstance(self.spi, SpiRecorder):
+                self.spi.close()
+                self.spi = self.spi.spi
+            self.spi = SpiRecorder(self.spi, path)
+
+    def stop_recording(self):
+        with self._bus_lock:
+            if isinstance(self.spi, SpiRecorder):
+                self.spi.close()
+                self.spi = self.spi.spi
+
+    async def flush(self):
+        # waits until all writes made so far have been transferred
+        with self._lock:
+            if not self._register_write_addresses and not self._writes_in_flight:
+                return
+            if self._wake_writer is None:
+                waiter = None
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                self._flush_waiters.append(waiter)
+                self._schedule_wake()
+        if waiter is None:
+            self._flush_writes()
         else:
-            self._write_buffer[key] &= ~(1 << bit)
-        self._register_write_addresses.add(key)
+            await waiter
 
-    async def communicate_coroutine(self):
-        while True:
-            self.communicate()
-            await asyncio.sleep(0.05)
+    async def communicate_coroutine(self, threaded: bool = False):
+        if threaded:
+            await self._communicate_threaded()
+            return
+        wake = asyncio.Event()
+        self._start_write_wakeups(asyncio.get_running_loop(), wake.set)
+        try:
+            deadline = time.monotonic()
+            while True:
+                start = time.monotonic()
+                self.communicate()
+                deadline = self._complete_cycle(deadline, start, time.monotonic())
+                # writes are flushed as they come in until the next deadline
+                while True:
+                    try:
+                        await asyncio.wait_for(wake.wait(), deadline - time.monotonic())
+                    except asyncio.TimeoutError:
+                        break
+                    wake.clear()
+                    self._flush_writes()
+        finally:
+            self._stop_write_wakeups()
 
     def communicate(self):
-        for address in self._register_write_addresses:
-            higherAddress = (address >> 8) & 0xFF
-            lowerAddress = address & 0xFF
-            self.spi.xfer2(
-                [128 + higherAddress, lowerAddress, self._write_buffer[address]]
+        changed_runs, change_listeners = self._transfer()
+        self._publish(time.monotonic(), changed_runs, change_listeners)
+
+    async def _communicate_threaded(self, post: Optional["_Post"] = None):
+        # a dedicated thread owns the bus and runs the transfer plan, the
+        # event loop only swaps in the completed snapshots and runs callbacks.
+        # post hands a completed cycle to the event loop, by default it is
+        # published right away (see SpiCoordinator for the alternative).
+        loop = asyncio.get_running_loop()
+        if post is None:
+
+            def post(timestamp, registers, changed_runs, change_listeners, published):
+                loop.call_soon_threadsafe(
+                    registers._publish,
+                    timestamp,
+                    changed_runs,
+                    change_listeners,
+                    published,
+                )
+
+        stopped = threading.Event()
+        wake = threading.Event()
+        done = loop.create_future()
+
+        def finish(exception: Optional[BaseException]):
+            if done.done():
+                return
+            if exception is None:
+                done.set_result(None)
+            else:
+                done.set_exception(exception)
+
+        def run():
+            exception: Optional[BaseException] = None
+            try:
+                self._transfer_thread(loop, stopped, wake, post)
+            except BaseException as e:
+                exception = e
+            try:
+                loop.call_soon_threadsafe(finish, exception)
+            except RuntimeError:
+                pass  # the event loop is already closed
+
+        thread = threading.Thread(target=run, name="spi-transfer", daemon=True)
+        self._start_write_wakeups(loop, wake.set)
+        thread.start()
+        try:
+            await done
+        finally:
+            self._stop_write_wakeups()
+            stopped.set()
+            wake.set()
+
+    def _transfer_thread(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        stopped: threading.Event,
+        wake: threading.Event,
+        post: "_Post",
+    ):
+        published = threading.Event()
+        deadline = time.monotonic()
+        while not stopped.is_set():
+            start = time.monotonic()
+            changed_runs, change_listeners = self._transfer()
+            published.clear()
+            try:
+                post(time.monotonic(), self, changed_runs, change_listeners, published)
+            except RuntimeError:
+                return  # the event loop is already closed
+            # the back buffer may only be reused once the loop swapped it in
+            while not published.wait(0.1):
+                if stopped.is_set() or loop.is_closed():
+                    return
+            deadline = self._complete_cycle(deadline, start, time.monotonic())
+            # writes are flushed as they come in until the next deadline
+            while wake.wait(max(0.0, deadline - time.monotonic())):
+                wake.clear()
+                if stopped.is_set():
+                    return
+                self._flush_writes()
+
+    def _start_write_wakeups(
+        self, loop: asyncio.AbstractEventLoop, wake_writer: Callable[[], None]
+    ):
+        with self._lock:
+            self._loop = loop
+            self._wake_writer = wake_writer
+            if self._register_write_addresses or self._flush_waiters:
+                self._schedule_wake()
+
+    def _stop_write_wakeups(self):
+        with self._lock:
+            self._loop = None
+            self._wake_writer = None
+
+    def _mark_dirty(self, key: int):
+        # called with the lock held, the first dirty register of a batch
+        # schedules a wakeup of the transfer loop
+        if not self._register_write_addresses and self._wake_writer is not None:
+            self._schedule_wake()
+        self._register_write_addresses.add(key)
+
+    def _schedule_wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake_after_delay)
+
+    def _wake_after_delay(self):
+        if self._loop is None or self._wake_writer is None:
+            return
+        if self.write_delay > 0:
+            self._loop.call_later(self.write_delay, self._wake_writer)
+        else:
+            self._wake_writer()
+
+    def _flush_writes(self):
+        with self._lock:
+            write_frames = self._take_write_frames()
+            waiters = self._flush_waiters
+            self._flush_waiters = []
+            self._writes_in_flight = bool(write_frames)
+        try:
+            with self._bus_lock:
+                for frame in write_frames:
+                    self.spi.xfer2(frame)
+                    self._cycle_xfers += 1
+                    self._cycle_bytes += len(frame)
+        finally:
+            with self._lock:
+                self._writes_in_flight = False
+            for waiter in waiters:
+                waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+
+    def _complete_cycle(self, deadline: float, start: float, end: float) -> float:
+        # records the timing of a cycle scheduled for deadline and returns the
+        # deadline of the next one. Deadlines are advanced by the period, not
+        # from the end of the cycle, so the rate does not drift with load.
+        jitter = start - deadline
+        self.cycles += 1
+        self._jitter_sum += jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        self.worst_cycle_time = max(self.worst_cycle_time, end - start)
+
+        deadline += self._period
+        if end > deadline:
+            # overrun: the missed cycles are merged into the next one, which
+            # polls every group that was due in any of them
+            missed = int((end - deadline) // self._period) + 1
+            self.overruns += 1
+            self.skipped_cycles += missed
+            self._merged_cycles += missed
+            deadline += missed * self._period
+
+        if self.log_interval is not None and end - self._last_log >= self.log_interval:
+            self._last_log = end
+            logger.info(
+                "%d cycles, %d overruns, worst cycle %.0fus, %s",
+                self.cycles,
+                self.overruns,
+                self.worst_cycle_time * 1e6,
+                self.statistics.summary(),
+            )
+        return deadline
+
+    def _transfer(self) -> Tuple[List["_ReadRun"], "_Listeners"]:
+        statistics = self.statistics
+        start = time.perf_counter()
+        self._flush_writes()
+        with self._lock:
+            read_plan = self._next_read_plan()
+
+        # the back buffer mirrors the read buffer on entry, only the runs of
+        # the read plan are transferred into it and compared
+        back = self._back_buffer
+        front = self._read_buffer
+        read_bytes = 0
+        with self._bus_lock:
+            for first, end, frame, _ in read_plan:
+                # multi-register mode: the data words map to decreasing
+                # addresses starting at the addressed register
+                back[first:end] = self.spi.xfer2(frame)[:1:-1]
+                read_bytes += len(frame)
+        transferred = time.perf_counter()
+
+        changed_runs = []
+        changed_addresses = 0
+        change_listeners: Set[Callable[["SpiRegisters"], None]] = set()
+        detailed_listeners: Dict["_DetailedCallback", Dict[int, int]] = dict()
+        for run in read_plan:
+            first, end, _, addresses = run
+            if back[first:end] == front[first:end]:
+                continue
+            changed_runs.append(run)
+            # the differing bytes of the run are found from the highest one
+            # down in a single integer, unchanged addresses are not visited
+            diff = int.from_bytes(back[first:end], "little") ^ int.from_bytes(
+                front[first:end], "little"
+            )
+            while diff:
+                offset = (diff.bit_length() - 1) >> 3
+                diff &= (1 << (offset << 3)) - 1
+                address = first + offset
+                registered = addresses.get(address)
+                if registered is None:
+                    continue  # bridged gap
+                callbacks, detailed = registered
+                previous = front[address]
+                changed_addresses += 1
+                change_listeners.update(callbacks)
+                for callback in detailed:
+                    changes = detailed_listeners.get(callback)
+                    if changes is None:
+                        detailed_listeners[callback] = {address: previous}
+                    else:
+                        changes[address] = previous
+
+        xfers = self._cycle_xfers + len(read_plan)
+        transferred_bytes = self._cycle_bytes + read_bytes
+        self._cycle_xfers = 0
+        self._cycle_bytes = 0
+        statistics.transfer_time.add(transferred - start)
+        statistics.change_detection_time.add(time.perf_counter() - transferred)
+        statistics.xfers.add(xfers)
+        statistics.bytes.add(transferred_bytes)
+        statistics.changed_addresses.add(changed_addresses)
+        statistics.total_xfers += xfers
+        statistics.total_bytes += transferred_bytes
+        return changed_runs, (change_listeners, detailed_listeners)
+
+    def _publish(
+        self,
+        timestamp: float,
+        changed_runs: List["_ReadRun"],
+        change_listeners: "_Listeners",
+        published: Optional[threading.Event] = None,
+    ):
+        back = self._back_buffer
+        front = self._read_buffer
+        self._read_buffer = back
+        self._back_buffer = front
+        for first, end, _, _ in changed_runs:
+            front[first:end] = back[first:end]
+        if published is not None:
+            published.set()
+
+        statistics = self.statistics
+        start = time.perf_counter()
+        self.cycle_time = timestamp
+        listeners, detailed_listeners = change_listeners
+        if self.profile_callbacks:
+            for listener in listeners:
+                listener_start = time.perf_counter()
+                listener(self)
+                statistics.add_callback(listener, time.perf_counter() - listener_start)
+            for detailed_listener, changes in detailed_listeners.items():
+                listener_start = time.perf_counter()
+                detailed_listener(self, changes)
+                statistics.add_callback(
+                    detailed_listener, time.perf_counter() - listener_start
+                )
+        else:
+            for listener in listeners:
+                listener(self)
+            for detailed_listener, changes in detailed_listeners.items():
+                detailed_listener(self, changes)
+        if self._cycle_changes:
+            cycle_changes = self._cycle_changes
+            self._cycle_changes = []
+            for changes_listener in list(self._changes_listeners):
+                changes_listener(timestamp, cycle_changes)
+        statistics.dispatch_time.add(time.perf_counter() - start)
+
+    def _take_write_frames(self) -> List[List[int]]:
+        addresses = self._register_write_addresses
+        if not addresses:
+            return []
+        self._register_write_addresses = set()
+        buffer = self._write_buffer
+        return [
+            self._frame(end - 1, [buffer[a] for a in range(end - 1, first - 1, -1)])
+            for first, end in _runs(addresses, 0)
+        ]
+
+    def _write_frame(self, address: int, data: Iterable[int]):
+        self.spi.xfer2(self._frame(address, data))
+
+    def _frame(self, address: int, data: Iterable[int]) -> List[int]:
+        higherAddress = (address >> 8) & 0xFF
+        lowerAddress = address & 0xFF
+        return [128 + higherAddress, lowerAddress, *data]
+
+    def precompute_plans(self, max_cycles: int = 1000):
+        # builds the read plans of the cycles until the poll groups repeat
+        # (at most max_cycles) ahead of the first cycle. Plans for cycles
+        # merged after overruns are still built on demand.
+        with self._lock:
+            divisors = self._due_divisors()
+            rotation = 1
+            for divisor in divisors:
+                rotation = rotation * divisor // math.gcd(rotation, divisor)
+            for cycle in range(min(rotation, max_cycles)):
+                self._read_plan(tuple(d for d in divisors if cycle % d == 0))
+
+    def _due_divisors(self) -> List[int]:
+        if self._poll_divisors is None:
+            self._poll_divisors = sorted(
+                {self._poll_divisor(p) for p in self._register_read_addresses.values()}
             )
-        self._register_write_addresses.clear()
+        return self._poll_divisors
 
-        new_registers = bytearray(self._read_buffer)
-        for address in self._register_read_addresses:
-            higherAddress = (address >> 8) & 0xFF
-            lowerAddress = address & 0xFF
-            new_registers[address] = self.spi.xfer2([higherAddress, lowerAddress, 0])[2]
+    def _next_read_plan(self) -> List["_ReadRun"]:
+        # every poll group is due in the cycles that are a multiple of its
+        # divisor, the plan for each combination of due groups is cached
+        divisors = self._due_divisors()
+        cycle = self._cycle
+        last = cycle + self._merged_cycles
+        self._cycle = last + 1
+        self._merged_cycles = 0
+        # a group is due if a multiple of its divisor lies in [cycle, last]
+        return self._read_plan(
+            tuple(d for d in divisors if last // d != (cycle - 1) // d)
+        )
+
+    def _read_plan(self, due: Tuple[int, ...]) -> List["_ReadRun"]:
+        plan = self._read_plans.get(due)
+        if plan is None:
+            plan = self._build_read_plan(
+                a
+                for a, p in self._register_read_addresses.items()
+                if self._poll_divisor(p) in due
+            )
+            self._read_plans[due] = plan
+        return plan
 
-        # check for changes between new_registers and self._registers_buffer
-        changes = [a != b for a, b in zip(new_registers, self._read_buffer)]
+    def _poll_divisor(self, period: float) -> int:
+        return max(1, round(period / self._period))
 
-        self._read_buffer = new_registers
+    def _build_read_plan(self, read_addresses: Iterable[int]) -> List["_ReadRun"]:
+        plan = []
+        callbacks = self._register_on_change_callbacks
+        detailed = self._register_detailed_callbacks
+        read_addresses = sorted(read_addresses)
+        for first, end in _runs(read_addresses, self.FRAME_OVERHEAD, self.READ_BURST):
+            higherAddress = ((end - 1) >> 8) & 0xFF
+            lowerAddress = (end - 1) & 0xFF
+            frame = [higherAddress, lowerAddress, *[0] * (end - first)]
+            addresses = {
+                a: (callbacks.get(a, ()), detailed.get(a, ()))
+                for a in read_addresses
+                if first <= a < end
+            }
+            plan.append((first, end, frame, addresses))
+        return plan
 
-        change_listeners = set()
-        for address, changed in enumerate(changes):
-            if changed:
-                change_listeners.update(self._register_on_change_callbacks[address])
 
-        for listener in change_listeners:
-            listener(self)
+_DetailedCallback = Callable[[SpiRegisters, Dict[int, int]], None]
+
+# first address, end address, transmit frame and the registered addresses of
+# the run mapped to their callbacks and detailed callbacks
+_ReadRun = Tuple[
+    int,
+    int,
+    List[int],
+    Dict[
+        int,
+        Tuple[
+            Tuple[Callable[[SpiRegisters], None], ...],
+            Tuple[_DetailedCallback, ...],
+        ],
+    ],
+]
+
+# callbacks of a cycle, detailed callbacks with the previous values of their
+# changed addresses
+_Listeners = Tuple[
+    Set[Callable[[SpiRegisters], None]], Dict[_DetailedCallback, Dict[int, int]]
+]
+
+# transition reported by a module: the module, the signal name for modules
+# with several signals (None otherwise) and the new value
+_Change = Tuple[object, Optional[str], object]
+_ChangesListener = Callable[[float, List[_Change]], None]
+
+# hands a completed cycle (timestamp, instance, changed runs, change listeners,
+# event to set once published) from the transfer thread to the event loop
+_Post = Callable[
+    [
+        float,
+        SpiRegisters,
+        List[_ReadRun],
+        _Listeners,
+        threading.Event,
+    ],
+    None,
+]
+
+
+def _resolve(future: "asyncio.Future[None]"):
+    if not future.done():
+        future.set_result(None)
+
+
+def _runs(
+    addresses: Iterable[int], max_gap: int, max_length: int = SpiRegisters.ADDRESS_SPACE
+) -> List[Tuple[int, int]]:
+    # groups addresses into [first, end) ranges of at most max_length
+    # addresses, bridging gaps of up to max_gap addresses
+    runs: List[List[int]] = []
+    for address in sorted(addresses):
+        if (
+            runs
+            and address - runs[-1][1] <= max_gap
+            and address - runs[-1][0] < max_length
+        ):
+            runs[-1][1] = address + 1
+        else:
+            runs.append([address, address + 1])
+    return [(first, end) for first, end in runs]
@@ -0,0 +1,114 @@
+from typing import Callable, Dict, List
+
+# histogram buckets are powers of two of the value multiplied by the scale,
+# i.e. microseconds for times and plain numbers for counts
+TIME_SCALE = 1e6
+COUNT_SCALE = 1
+BUCKETS = 24
+
+
+class Histogram:
+    def __init__(self, scale: float):
+        self.scale = scale
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[min(int(value * self.scale).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def bound(self, bucket: int) -> float:
+        # exclusive upper bound of the values in a bucket
+        return (1 << bucket) / self.scale
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        # upper bound of the bucket containing the percentile
+        threshold = self.count * percentile / 100
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold and seen > 0:
+                return min(self.bound(bucket), self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": {
+                self.bound(bucket): count
+                for bucket, count in enumerate(self.counts)
+                if count
+            },
+        }
+
+
+class SpiStatistics:
+    # per-cycle counters of the SPI engine. dispatch_time and callbacks are
+    # filled on the event loop, everything else on the transfer side.
+    def __init__(self):
+        self.transfer_time = Histogram(TIME_SCALE)
+        self.change_detection_time = Histogram(TIME_SCALE)
+        self.dispatch_time = Histogram(TIME_SCALE)
+        self.xfers = Histogram(COUNT_SCALE)
+        self.bytes = Histogram(COUNT_SCALE)
+        self.changed_addresses = Histogram(COUNT_SCALE)
+        self.callbacks: Dict[str, Histogram] = dict()
+        self.total_xfers = 0
+        self.total_bytes = 0
+
+    def add_callback(self, callback: Callable, elapsed: float):
+        name = callback_name(callback)
+        histogram = self.callbacks.get(name)
+        if histogram is None:
+            histogram = self.callbacks[name] = Histogram(TIME_SCALE)
+        histogram.add(elapsed)
+
+    def as_dict(self) -> dict:
+        return {
+            "transfer_time": self.transfer_time.as_dict(),
+            "change_detection_time": self.change_detection_time.as_dict(),
+            "dispatch_time": self.dispatch_time.as_dict(),
+            "xfers": self.xfers.as_dict(),
+            "bytes": self.bytes.as_dict(),
+            "changed_addresses": self.changed_addresses.as_dict(),
+            "total_xfers": self.total_xfers,
+            "total_bytes": self.total_bytes,
+            "callbacks": {
+                name: histogram.as_dict()
+                for name, histogram in sorted(
+                    self.callbacks.items(), key=lambda item: -item[1].total
+                )
+            },
+        }
+
+    def summary(self) -> str:
+        parts: List[str] = [
+            f"transfer {self.transfer_time.mean * 1e6:.0f}us"
+            f" (max {self.transfer_time.max * 1e6:.0f}us)",
+            f"diff {self.change_detection_time.mean * 1e6:.0f}us",
+            f"dispatch {self.dispatch_time.mean * 1e6:.0f}us"
+            f" (max {self.dispatch_time.max * 1e6:.0f}us)",
+            f"{self.xfers.mean:.1f} xfers/{self.bytes.mean:.0f} bytes per cycle",
+            f"{self.changed_addresses.mean:.1f} changed addresses per cycle",
+        ]
+        if self.callbacks:
+            name, histogram = max(self.callbacks.items(), key=lambda i: i[1].total)
+            parts.append(f"top callback {name} {histogram.total * 1e3:.1f}ms total")
+        return ", ".join(parts)
+
+
+def callback_name(callback: Callable) -> str:
+    return getattr(callback, "__qualname__", None) or repr(callback)
@@ -0,0 +1,198 @@
+import argparse
+import socket
+import socketserver
+import struct
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Sequence, Tuple, Union
+
+import spidev
+
+# frames are sent over sockets prefixed with their length
+_LENGTH = struct.Struct(">H")
+
+SocketAddress = Union[str, Tuple[str, int]]
+
+
+class Transport(ABC):
+    # a full-duplex SPI transfer, xfer2 keeps the chip select asserted for
+    # the whole frame and returns the received words
+    max_speed_hz: int = 0
+
+    @abstractmethod
+    def xfer2(self, data: Sequence[int]) -> List[int]: ...
+
+    def close(self):
+        pass
+
+
+class SpidevTransport(Transport):
+    def __init__(self, bus: int = 0, device: int = 0, max_speed_hz: int = 5000000):
+        self.spi = spidev.SpiDev()
+        self.spi.open(bus, device)
+        self.spi.max_speed_hz = max_speed_hz
+        # skip the indirection in the hot path
+        self.xfer2 = self.spi.xfer2  # type: ignore[method-assign]
+
+    def xfer2(self, data: Sequence[int]) -> List[int]:
+        return self.spi.xfer2(data)
+
+    @property  # type: ignore[override]
+    def max_speed_hz(self) -> int:
+        return self.spi.max_speed_hz
+
+    @max_speed_hz.setter
+    def max_speed_hz(self, max_speed_hz: int):
+        self.spi.max_speed_hz = max_speed_hz
+
+    def close(self):
+        self.spi.close()
+
+
+class MemoryTransport(Transport):
+    # register file behind the GOLDi bus framing: a configuration word with
+    # the write enable bit and the address of the first register, followed by
+    # data words for decreasing addresses, or for the same address with the
+    # stream enable bit set. Frames reaching outside the register file raise
+    # IndexError.
+    address_width = 14
+    tag_bits = 0
+
+    def __init__(self, size: int = 32768):
+        self.registers = bytearray(size)
+
+    def decode(self, data: Sequence[int]) -> Tuple[bool, int, int, int]:
+        # write enable, tag, first address and address step of a frame
+        config = data[0] << 8 | data[1]
+        tag = (config >> self.address_width) & ((1 << self.tag_bits) - 1)
+        address = config & ((1 << self.address_width) - 1)
+        return bool(config & 0x8000), tag, address, 0 if config & 0x4000 else 1
+
+    def xfer2(self, data: Sequence[int]) -> List[int]:
+        write, _, address, step = self.decode(data)
+        count = len(data) - 2
+        if count and not (
+            address < len(self.registers) and address - (count - 1) * step >= 0
+        ):
+            raise IndexError(f"frame at {address} reaches outside the registers")
+        if write:
+            for i, value in enumerate(data[2:]):
+                self.registers[address - i * step] = value
+            return [0] * len(data)
+        return [0, 0, *[self.registers[address - i * step] for i in range(count)]]
+
+
+class SocketTransport(Transport):
+    # talks to a TransportServer, address is a unix socket path or a
+    # (host, port) tuple
+    def __init__(self, address: SocketAddress):
+        if isinstance(address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.connect(address)
+        self._file = self._socket.makefile("rwb")
+
+    def xfer2(self, data: Sequence[int]) -> List[int]:
+        self._file.write(_LENGTH.pack(len(data)) + bytes(data))
+        self._file.flush()
+        return list(_read_frame(self._file))
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+class TransportServer:
+    # exposes a transport to SocketTransport clients, e.g. a MemoryTransport
+    # acting as an FPGA stand-in
+    def __init__(self, transport: Transport, address: SocketAddress):
+        self.transport = transport
+        self.lock = threading.Lock()
+        self.server: _Server
+        if isinstance(address, str):
+            self.server = _UnixServer(address, _TransportHandler)
+        else:
+            self.server = _TcpServer(address, _TransportHandler)
+        self.server.transport_server = self
+        self.server_address = self.server.server_address
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self.server.serve_forever(poll_interval)
+
+    def shutdown(self):
+        self.server.shutdown()
+
+    def server_close(self):
+        self.server.server_close()
+
+
+class _TransportHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        if self.request.family != socket.AF_UNIX:
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        server: TransportServer = self.server.transport_server  # type: ignore
+        while True:
+            try:
+                data = _read_frame(self.rfile)
+            except EOFError:
+                return
+            with server.lock:
+                response = server.transport.xfer2(list(data))
+            self.wfile.write(_LENGTH.pack(len(response)) + bytes(response))
+            self.wfile.flush()
+
+
+class _Server(socketserver.BaseServer):
+    transport_server: TransportServer
+
+
+class _TcpServer(_Server, socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(_Server, socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def open_transport(address: str, transport: Transport) -> TransportServer:
+    # serves transport at address, a unix socket path or host:port
+    socket_address: SocketAddress = address
+    if ":" in address:
+        host, port = address.rsplit(":", 1)
+        socket_address = (host, int(port))
+    return TransportServer(transport, socket_address)
+
+
+def _read_frame(file) -> bytes:
+    head = file.read(_LENGTH.size)
+    if len(head) < _LENGTH.size:
+        raise EOFError("connection closed")
+    (length,) = _LENGTH.unpack(head)
+    data = file.read(length)
+    if len(data) < length:
+        raise EOFError("connection closed")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serves an in-memory register file as FPGA stand-in"
+    )
+    parser.add_argument("address", help="unix socket path or host:port to listen on")
+    args = parser.parse_args()
+
+    server = open_transport(args.address, MemoryTransport())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,19 @@ class MockRegisters:
         self.change_callbacks = dict()
         self._read_buffer = bytearray(128)
         self._write_buffer = bytearray(128)
+        self.cycle_time = 0.0
+        self.reported_changes = []
 
-    def add_register(self, address, changed):
+    def add_register(self, address, changed, period=None, detailed=False):
         self.change_callbacks[address] = changed
 
+    def report_change(self, source, name, value):
+        self.reported_changes.append((source, name, value))
+
+    def add_registers(self, addresses, changed, period=None, detailed=False):
+        for address in addresses:
+            self.add_register(address, changed, period, detailed)
+
     def __getitem__(self, key: int):
         return self._read_buffer[key]
 
@@ -22,6 +31,14 @@ class MockRegisters:
         else:
             self._write_buffer[key] &= ~(1 << bit)
 
+    def setBytes(self, values):
+        for key, value in values.items():
+            self[key] = value
+
+    def setBits(self, bits):
+        for key, bit, value in bits:
+            self.setBit(key, bit, value)
+
     def setReadBuffer(self, address: int, value: int):
         self._read_buffer[address] = value
 
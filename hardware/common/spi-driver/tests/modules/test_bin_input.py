@@ -136,3 +136,76 @@ def test_bin_input_sparse():
     assert input["A1"] == True
     assert input["B0"] == True
     assert input["B1"] == False
+
+
+def test_bin_input_changes():
+    registers = MockRegisters()
+    input = BinInput(registers, 0x10, signalNames)
+
+    events = []
+
+    def on_change(index, value):
+        events.append((index, value))
+
+    registers.change_callbacks[0x10](registers, {0x10: 0})
+    input.on("change", on_change)
+
+    # only the flipped bits of the changed registers are decoded
+    registers.setReadBuffer(0x10, 0b10000001)
+    registers.setReadBuffer(0x11, 0b00000010)
+    registers.change_callbacks[0x10](registers, {0x10: 0b00000000})
+    assert events == [("A0", True), ("A7", True)]
+
+    registers.setReadBuffer(0x10, 0b10000000)
+    registers.change_callbacks[0x10](registers, {0x10: 0b10000001, 0x11: 0})
+    assert events[2:] == [("A0", False), ("B1", True)]
+
+
+def test_bin_input_changes_event():
+    registers = MockRegisters()
+    input = BinInput(registers, 0x10, signalNames)
+
+    batches = []
+    input.on("changes", lambda timestamp, changes: batches.append((timestamp, changes)))
+    registers.change_callbacks[0x10](registers)
+
+    registers.cycle_time = 1.5
+    registers.setReadBuffer(0x10, 0b00000011)
+    registers.setReadBuffer(0x11, 0b10000000)
+    registers.change_callbacks[0x10](registers, {0x10: 0, 0x11: 0})
+
+    transitions = [("A0", True), ("A1", True), ("B7", True)]
+    assert batches[1] == (1.5, transitions)
+    assert registers.reported_changes[-3:] == [(input, *t) for t in transitions]
+
+
+def test_bin_input_seeded():
+    registers = MockRegisters()
+    input = BinInput(registers, 0x10, signalNames)
+
+    events = []
+    input.on("change", lambda name, value: events.append((name, value)))
+
+    # the first change only reports the flipped bit, not the state of the
+    # other signals
+    registers.setReadBuffer(0x10, 0b00110000)
+    registers.setReadBuffer(0x11, 0b00000001)
+    registers.change_callbacks[0x10](registers, {0x10: 0b00010000})
+    assert events == [("A5", True)]
+
+
+def test_bin_input_batch_only():
+    registers = MockRegisters()
+    input = BinInput(registers, 0x10, signalNames, per_signal=False)
+
+    events = []
+    batches = []
+    input.on("change", lambda name, value: events.append((name, value)))
+    input.on("changes", lambda timestamp, changes: batches.append(changes))
+
+    registers.change_callbacks[0x10](registers, {})
+    registers.setReadBuffer(0x11, 0b01000100)
+    registers.change_callbacks[0x10](registers, {0x11: 0})
+
+    assert events == []
+    assert batches == [[("B2", True), ("B6", True)]]
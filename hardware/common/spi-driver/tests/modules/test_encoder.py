@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from spi_driver.emulator import BusEmulator
+from spi_driver.modules.encoder import Encoder
+from spi_driver.modules.numeric import Numeric
+from spi_driver.spi_registers import SpiRegisters
+
+from .mock_registers import MockRegisters
+
+
+def sample(registers, value, timestamp):
+    registers.cycle_time = timestamp
+    registers.setReadBuffer(0x10, value & 0xFF)
+    registers.setReadBuffer(0x11, value >> 8)
+    registers.change_callbacks[0x10](registers)
+
+
+def test_encoder_estimates():
+    async def main():
+        registers = MockRegisters()
+        encoder = Encoder(registers, Numeric(registers, 0x10), samples=4)
+
+        start = time.monotonic()
+        # 100 counts/s, then 200 counts/s
+        for i, value in enumerate([0, 1, 2, 3, 5, 7, 9]):
+            sample(registers, value, start + i * 0.01)
+
+        now = start + 0.06
+        assert abs(encoder.velocity(now) - 200) < 1e-6
+        assert abs(encoder.acceleration()) < 1e-3
+        # no count for 0.1 s bounds the speed to 10 counts/s
+        assert abs(encoder.velocity(now + 0.1) - 10) < 1e-6
+
+        sample(registers, 12, now + 0.01)
+        assert encoder.acceleration() > 0
+
+    asyncio.run(main())
+
+
+def test_encoder_events():
+    async def main():
+        registers = MockRegisters()
+        encoder = Encoder(registers, Numeric(registers, 0x10), settled_speed=50)
+
+        events = []
+        encoder.on("moving", lambda velocity: events.append(("moving", velocity)))
+        encoder.on("settled", lambda position: events.append(("settled", position)))
+        encoder.on("stalled", lambda position: events.append(("stalled", position)))
+
+        start = time.monotonic()
+        for i in range(5):
+            sample(registers, i, start + i * 0.005)
+        assert encoder.moving
+        assert events[0][0] == "moving" and abs(events[0][1] - 200) < 1e-6
+
+        # settles 1 / settled_speed seconds after the last count
+        assert await encoder.stopped() == "settled"
+        assert time.monotonic() - (start + 0.02) >= 0.02
+        assert events[1:] == [("settled", 4)]
+
+        encoder.stall_time = 0.01
+        encoder.drive(True)
+        assert await encoder.stopped() == "stalled"
+        encoder.drive(False)
+        assert events[2:] == [("stalled", 4)]
+
+    asyncio.run(main())
+
+
+def test_encoder_without_loop():
+    registers = MockRegisters()
+    encoder = Encoder(registers, Numeric(registers, 0x10), settled_speed=50)
+    events = []
+    encoder.on("settled", lambda position: events.append(("settled", position)))
+    encoder.on("stalled", lambda position: events.append(("stalled", position)))
+
+    start = time.monotonic()
+    for i in range(5):
+        sample(registers, i, start + i * 0.005)
+    assert encoder.moving
+
+    # the passed deadlines are noticed with the next change, the stall time
+    # starts with the first slow change
+    encoder.stall_time = 0.05
+    encoder.drive(True)
+    sample(registers, 5, start + 0.2)
+    assert not encoder.moving
+    assert events == [("settled", 5)]
+    sample(registers, 6, start + 0.4)
+    assert events[1:] == [("stalled", 6)]
+
+    # a moving counter on the bus, cycles run without event loop
+    bus = BusEmulator()
+    registers = SpiRegisters(transport=bus)
+    encoder = Encoder(registers, Numeric(registers, 0x10))
+    for i in range(10):
+        bus.registers[0x10] = i * 10
+        registers.communicate()
+    assert encoder.value() == 90
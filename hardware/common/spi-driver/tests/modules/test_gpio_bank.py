@@ -0,0 +1,56 @@
+from spi_driver.modules.gpio_bank import GpioBank
+
+from .mock_registers import MockRegisters
+
+
+def test_gpio_bank_channels():
+    registers = MockRegisters()
+    bank = GpioBank(registers, 0x10, 8)
+
+    assert len(bank) == 8
+    assert bank[3] is bank[3]
+
+    registers.setReadBuffer(0x13, 0b00000001)
+    assert bank[3].value() == True
+    assert bank.values() == [False, False, False, True, False, False, False, False]
+
+    bank[2].set(True)
+    bank[2].setOutput(True)
+    assert registers.getWriteBuffer(0x12) == 0b00000011
+
+
+def test_gpio_bank_bulk():
+    registers = MockRegisters()
+    bank = GpioBank(registers, 0x10, 8)
+
+    bank.setOutputs([True] * 4)
+    bank.setValues({1: True, 3: True})
+    assert [registers.getWriteBuffer(0x10 + i) for i in range(5)] == [
+        0b10,
+        0b11,
+        0b10,
+        0b11,
+        0b00,
+    ]
+
+
+def test_gpio_bank_events():
+    registers = MockRegisters()
+    bank = GpioBank(registers, 0x10, 8)
+
+    events = []
+    batches = []
+    bank[5].on("change", events.append)
+    bank.on("changes", lambda timestamp, changes: batches.append(changes))
+
+    registers.change_callbacks[0x10](registers)
+    assert events == [False]
+
+    registers.setReadBuffer(0x15, 0b00000001)
+    registers.setReadBuffer(0x16, 0b00000011)
+    # an output enable change alone is not reported
+    registers.setReadBuffer(0x17, 0b00000010)
+    registers.change_callbacks[0x10](registers, {0x15: 0, 0x16: 0, 0x17: 0})
+
+    assert events == [False, True]
+    assert batches[1] == [(5, True), (6, True)]
@@ -1,3 +1,5 @@
+import pytest
+
 from spi_driver.modules.numeric import Numeric
 
 from .mock_registers import MockRegisters
@@ -48,3 +50,58 @@ def test_numeric_event():
     registers.change_callbacks[0x10](registers)
 
     assert events == [0, 288]
+
+
+def test_numeric_changes():
+    registers = MockRegisters()
+    numeric = Numeric(registers, 0x10)
+
+    events = []
+    numeric.on("change", events.append)
+
+    registers.setReadBuffer(0x10, 0x34)
+    registers.setReadBuffer(0x11, 0x12)
+    registers.change_callbacks[0x10](registers, {0x10: 0, 0x11: 0})
+    registers.setReadBuffer(0x11, 0x56)
+    registers.change_callbacks[0x10](registers, {0x11: 0x12})
+
+    assert events == [0x1234, 0x5634]
+
+
+def test_numeric_signed_wide():
+    registers = MockRegisters()
+    signed = Numeric(registers, 0x10, 16, signed=True)
+    wide = Numeric(registers, 0x20, 24, "big")
+
+    registers.setReadBuffer(0x10, 0xFE)
+    registers.setReadBuffer(0x11, 0xFF)
+    registers.setReadBuffer(0x20, 0x56)
+    registers.setReadBuffer(0x21, 0x34)
+    registers.setReadBuffer(0x22, 0x12)
+    assert signed.value() == -2
+    assert wide.value() == 0x563412
+
+    signed.set(-256)
+    assert registers.getWriteBuffer(0x10) == 0x00
+    assert registers.getWriteBuffer(0x11) == 0xFF
+    with pytest.raises(ValueError):
+        signed.set(0x8000)
+
+
+def test_numeric_extend():
+    registers = MockRegisters()
+    counter = Numeric(registers, 0x10, 16, extend=True)
+
+    events = []
+    wraps = []
+    counter.on("change", events.append)
+    counter.on("wrap", wraps.append)
+
+    for raw in [0xFFF0, 0x0010, 0xFFF0, 0x8000]:
+        registers.setReadBuffer(0x10, raw & 0xFF)
+        registers.setReadBuffer(0x11, raw >> 8)
+        registers.change_callbacks[0x10](registers)
+
+    assert events == [0xFFF0, 0x10010, 0xFFF0, 0x8000]
+    assert wraps == [1, -1]
+    assert counter.value() == 0x8000
@@ -0,0 +1,37 @@
+import asyncio
+
+from spi_driver.modules.subscription import Subscription
+
+
+def test_subscription_filters():
+    values = []
+    subscription = Subscription(values.append, min_delta=3, deadband=5)
+
+    for value in [0, 1, 3, 10, 8, 4, 20]:
+        subscription(value)
+
+    # 1 is within min_delta, 8 reverses by no more than the deadband
+    assert values == [0, 3, 10, 4, 20]
+
+
+def test_subscription_rate():
+    async def main():
+        events = []
+        subscription = Subscription(
+            lambda name, value: events.append((name, value)), max_rate=20
+        )
+
+        for value in range(10):
+            subscription("x", value)
+        assert events == [("x", 0)]
+
+        # the latest value is delivered at the end of the interval
+        await asyncio.sleep(0.08)
+        assert events == [("x", 0), ("x", 9)]
+
+        subscription("x", 10)
+        subscription.close()
+        await asyncio.sleep(0.08)
+        assert events == [("x", 0), ("x", 9)]
+
+    asyncio.run(main())
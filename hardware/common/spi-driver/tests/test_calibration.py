@@ -0,0 +1,36 @@
+import pytest
+
+from spi_driver.calibration import calibrate, load_rate, save_rate
+from spi_driver.emulator import BusEmulator
+from spi_driver.spi_registers import SpiRegisters
+
+
+def test_calibrate():
+    bus = BusEmulator(max_reliable_hz=12e6)
+    bus.registers[0x24] = 0x42
+    registers = SpiRegisters(transport=bus)
+
+    # the patterns reach the hardware behind the register
+    with pytest.raises(ValueError):
+        calibrate(registers, 0x24)
+    assert bus.frames == 0
+
+    # reliable up to 10 MHz, the margin of 0.75 allows up to 7.5 MHz
+    assert calibrate(registers, 0x24, allow_side_effects=True) == 5000000
+    assert bus.max_speed_hz == 5000000
+    assert bus.registers[0x24] == 0x42
+    assert calibrate(registers, 0x24, margin=1, allow_side_effects=True) == 10000000
+
+    bus.max_reliable_hz = 100000
+    with pytest.raises(RuntimeError):
+        calibrate(registers, 0x24, allow_side_effects=True)
+
+
+def test_persist_rate(tmp_path):
+    path = str(tmp_path / "calibration.json")
+    assert load_rate("mole", path) is None
+    save_rate("mole", 8000000, path)
+    save_rate("warehouse_v2", 2000000, path)
+    assert load_rate("mole", path) == 8000000
+    assert load_rate("warehouse_v2", path) == 2000000
+    assert load_rate("axis_portal_v1", path) is None
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+from spi_driver import SpiCoordinator, SpiRegisters
+from spi_driver.emulator import BusEmulator
+
+
+def test_coordinator():
+    async def main():
+        buses = [BusEmulator(), BusEmulator()]
+        instances = [
+            SpiRegisters(period=0.001, transport=bus, bus=i)
+            for i, bus in enumerate(buses)
+        ]
+        changes = []
+        changed = asyncio.Event()
+
+        def on_change(registers):
+            changes.append((instances.index(registers), threading.get_ident()))
+            if len(changes) == 2:
+                changed.set()
+
+        for registers in instances:
+            registers.add_register(0x05, on_change)
+        buses[0].registers[0x05] = 1
+        buses[1].registers[0x05] = 2
+
+        coordinator = SpiCoordinator(instances)
+        task = asyncio.create_task(coordinator.communicate_coroutine())
+        await asyncio.wait_for(changed.wait(), 1)
+        task.cancel()
+
+        assert sorted(changes) == [
+            (0, threading.get_ident()),
+            (1, threading.get_ident()),
+        ]
+        assert [registers[0x05] for registers in instances] == [1, 2]
+
+    asyncio.run(main())
+
+
+def test_coordinator_order():
+    async def main():
+        instances = [SpiRegisters(transport=BusEmulator()) for _ in range(3)]
+        coordinator = SpiCoordinator(instances)
+        coordinator._loop = asyncio.get_running_loop()
+        order = []
+        events = [threading.Event() for _ in instances]
+
+        for i, timestamp in enumerate([3.0, 1.0, 2.0]):
+            listeners = ({lambda _, i=i: order.append(i)}, {})
+            coordinator._post(timestamp, instances[i], [], listeners, events[i])
+        await asyncio.sleep(0)
+
+        assert order == [1, 2, 0]
+        assert all(event.is_set() for event in events)
+
+    asyncio.run(main())
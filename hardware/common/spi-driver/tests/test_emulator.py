@@ -0,0 +1,44 @@
+import pytest
+
+from spi_driver.emulator import BusEmulator
+from spi_driver.modules import Numeric
+from spi_driver.spi_registers import SpiRegisters
+
+
+def test_emulator_framing():
+    bus = BusEmulator(read_only=[0x07])
+    assert bus.xfer2([0x80, 0x08, 1, 2, 3]) == [0, 0, 0, 0, 0]
+    assert bus.registers[6:9] == bytearray([3, 0, 1])
+
+    # addresses wrap around, tags do not change the address
+    bus.xfer2([0x80 | 0x3C, 0x00, 4, 5])
+    assert bus.registers[0] == 4
+    assert bus.registers[0x3FF] == 5
+    assert bus.xfer2([0x3C, 0x00, 0, 0]) == [0, 0, 4, 5]
+
+
+def test_emulator_stream_and_hooks():
+    bus = BusEmulator()
+    fifo = [0x11, 0x22, 0x33]
+    tags = []
+    bus.read_hooks[0x20] = lambda tag: fifo.pop(0)
+    bus.write_hooks[0x21] = lambda value, tag: tags.append((value, tag))
+
+    assert bus.xfer2([0x40, 0x20, 0, 0, 0]) == [0, 0, 0x11, 0x22, 0x33]
+    bus.xfer2([0xC0 | 0x14, 0x21, 1, 2])
+    assert tags == [(1, 5), (2, 5)]
+    assert bus.registers[0x21] == 0
+
+
+def test_emulator_timing():
+    bus = BusEmulator(max_speed_hz=1000000, cs_overhead=10e-6)
+    registers = SpiRegisters(transport=bus)
+    Numeric(registers, 0x10)
+    registers[0x20] = 1
+    registers.communicate()
+
+    assert bus.frames == 2
+    assert bus.bytes == 3 + 4
+    assert bus.bus_time == pytest.approx(2 * 10e-6 + 7 * 8e-6)
+    bus.reset_timing()
+    assert bus.bus_time == 0
@@ -0,0 +1,83 @@
+import spidev
+
+from spi_driver.emulator import BusEmulator
+from spi_driver.modules import Numeric
+from spi_driver.recorder import READ, WRITE, ReplaySpiDev, SpiRecorder, read_log
+from spi_driver.spi_registers import SpiRegisters
+
+
+class CountingSpiDev:
+    def __init__(self):
+        self.registers = bytearray(1024)
+
+    def open(self, bus, device):
+        pass
+
+    def xfer2(self, data):
+        address = ((data[0] & 0x3F) << 8) + data[1]
+        if data[0] & 0x80:
+            for i, value in enumerate(data[2:]):
+                self.registers[address - i] = value
+            return [0] * len(data)
+        response = [0, 0, *[self.registers[address - i] for i in range(len(data) - 2)]]
+        # a free running encoder at 0x10/0x11
+        value = (self.registers[0x10] | self.registers[0x11] << 8) + 300
+        self.registers[0x10] = value & 0xFF
+        self.registers[0x11] = (value >> 8) & 0xFF
+        return response
+
+
+def test_record_and_replay(monkeypatch, tmp_path):
+    log = str(tmp_path / "spi.log")
+
+    monkeypatch.setattr(spidev, "SpiDev", CountingSpiDev)
+    registers = SpiRegisters()
+    encoder = Numeric(registers, 0x10)
+    recorded = []
+    encoder.on("change", recorded.append)
+    registers.record(log)
+    registers[0x20] = 0x05
+    for _ in range(5):
+        registers.communicate()
+    registers.stop_recording()
+    registers.communicate()
+
+    transactions = list(read_log(log))
+    assert [t.direction for t in transactions] == [WRITE, READ, READ, READ, READ, READ]
+    assert transactions[0].address == 0x20
+    assert transactions[0].payload == b"\x05"
+    assert transactions[1].address == 0x11
+    assert transactions[1].payload == b"\x00\x00"
+    assert transactions[2].payload == b"\x01\x2c"
+    assert transactions[1].timestamp <= transactions[5].timestamp
+
+    registers = SpiRegisters(transport=ReplaySpiDev(log))
+    encoder = Numeric(registers, 0x10)
+    replayed = []
+    encoder.on("change", replayed.append)
+    while not registers.spi.exhausted:
+        registers.communicate()
+
+    assert recorded == [300, 600, 900, 1200, 1500]
+    assert replayed == [300, 600, 900, 1200]
+
+
+def test_stream_read(tmp_path):
+    log = str(tmp_path / "spi.log")
+    bus = BusEmulator()
+    bus.registers[3:6] = bytes([0x22, 0x11, 0xA5])
+    recorder = SpiRecorder(bus, log)
+    recorder.xfer2([0x00, 0x05, 0, 0, 0])
+    bus.registers[0x05] = 0xB6
+    assert recorder.xfer2([0x40, 0x05, 0, 0, 0]) == [0, 0, 0xB6, 0xB6, 0xB6]
+    recorder.close()
+
+    read, stream = read_log(log)
+    assert (read.address, read.stream) == (0x05, False)
+    assert (stream.address, stream.direction, stream.stream) == (0x05, READ, True)
+
+    replay = ReplaySpiDev(log)
+    assert replay.xfer2([0x00, 0x05, 0, 0, 0]) == [0, 0, 0xA5, 0x11, 0x22]
+    assert replay.xfer2([0x40, 0x05, 0, 0]) == [0, 0, 0xB6, 0xB6]
+    # the stream read only updated its own register
+    assert replay.xfer2([0x00, 0x04, 0, 0]) == [0, 0, 0x11, 0x22]
@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import pytest
+
+from spi_driver.emulator import BusEmulator
+from spi_driver.modules import Bit, Encoder, Numeric
+from spi_driver.register_map import RegisterMap, compile_map, load_map
+from spi_driver.spi_registers import SpiRegisters
+
+SOURCE = {
+    "board": "test",
+    "modules": {
+        "hold": {"type": "Bit", "address": 1, "bit": 2},
+        "limit": {"type": "Bit", "address": 2, "bit": 3, "period": "slow"},
+        "counter": {"type": "Numeric", "address": 9, "size": 16},
+        "motion": {"type": "Encoder", "numeric": "counter"},
+    },
+    "init": [{"address": 18, "data": ["0x09", 69]}],
+}
+
+
+def test_build(tmp_path):
+    path = tmp_path / "register_map.json"
+    path.write_text(json.dumps(SOURCE))
+    register_map = load_map(str(path))
+    assert register_map.board == "test"
+
+    bus = BusEmulator(trace=True)
+    bus.registers[9] = 0x34
+    bus.registers[10] = 0x12
+    registers = SpiRegisters(transport=bus)
+
+    class Target:
+        pass
+
+    target = register_map.build(registers, Target())
+    assert isinstance(target.hold, Bit)
+    assert isinstance(target.counter, Numeric)
+    assert isinstance(target.motion, Encoder)
+    assert bus.transactions == [[0x80, 18, 0x09, 69]]
+    # the plans of both poll groups are built ahead of the first cycle
+    assert len(registers._read_plans) == 2
+
+    registers.communicate()
+    assert target.counter.value() == 0x1234
+    assert target.motion.value() == 0x1234
+
+
+def test_open(tmp_path):
+    path = tmp_path / "register_map.json"
+    path.write_text(json.dumps(SOURCE))
+    bus = BusEmulator(trace=True)
+    bus.registers[9] = 0x34
+
+    class Target:
+        pass
+
+    async def main():
+        target = Target()
+        registers = RegisterMap.open(
+            str(path), target, SpiRegisters(transport=bus), threaded=False
+        )
+        # the snapshot is read before the first cycle
+        assert target.counter.value() == 0x34
+        await asyncio.sleep(0.05)
+        assert registers.statistics.xfers.count > 0
+        for task in asyncio.all_tasks() - {asyncio.current_task()}:
+            task.cancel()
+
+    asyncio.run(main())
+
+
+def test_invalid():
+    def modules(**entries):
+        return {"board": "test", "modules": entries}
+
+    with pytest.raises(ValueError, match="unknown module type"):
+        compile_map(modules(a={"type": "Register", "address": 1}))
+    with pytest.raises(ValueError, match="a:"):
+        compile_map(modules(a={"type": "Bit", "address": 1}))
+    with pytest.raises(ValueError, match="a:"):
+        compile_map(modules(a={"type": "Bit", "address": 1, "bit": 0, "width": 2}))
+    with pytest.raises(ValueError, match="poll class"):
+        compile_map(modules(a={"type": "Gpio", "address": 1, "period": "often"}))
+    with pytest.raises(ValueError, match="earlier module"):
+        compile_map(modules(a={"type": "Encoder", "numeric": "b"}))
+    with pytest.raises(ValueError, match="not a byte"):
+        compile_map({"board": "test", "init": [{"address": 1, "data": [256]}]})
+    with pytest.raises(ValueError, match="a: module entry"):
+        compile_map(modules(a=["Bit", 1, 0]))
+    with pytest.raises(ValueError, match="a: address must be an integer"):
+        compile_map(modules(a={"type": "Gpio", "address": "1"}))
+    with pytest.raises(ValueError, match="a: speed_address must be an integer"):
+        compile_map(
+            modules(a={"type": "Motor", "direction_address": 1, "speed_address": 2.0})
+        )
+    with pytest.raises(ValueError, match="a: bit 9 out of range"):
+        compile_map(modules(a={"type": "Bit", "address": 1, "bit": 9}))
+    with pytest.raises(ValueError, match="a: bit -1 is less than 0"):
+        compile_map(modules(a={"type": "Bit", "address": 1, "bit": -1}))
+    with pytest.raises(ValueError, match="a: size 12"):
+        compile_map(modules(a={"type": "Numeric", "address": 1, "size": 12}))
+    with pytest.raises(ValueError, match="a: signalNames"):
+        compile_map(modules(a={"type": "BinInput", "address": 1, "signalNames": "a"}))
+
+    # bits of the same register may belong to different modules
+    compile_map(
+        modules(
+            a={"type": "Bit", "address": 1, "bit": 0},
+            b={"type": "Bit", "address": 1, "bit": 1},
+        )
+    )
+    with pytest.raises(ValueError, match="claimed by a"):
+        compile_map(
+            modules(
+                a={"type": "Numeric", "address": 1, "size": 16},
+                b={"type": "Bit", "address": 2, "bit": 1},
+            )
+        )
+    # the stepper motor speed is 16 bit wide
+    with pytest.raises(ValueError, match="claimed by a"):
+        compile_map(
+            modules(
+                a={"type": "StepperMotor", "direction_address": 1, "speed_address": 2},
+                b={"type": "Gpio", "address": 3},
+            )
+        )
@@ -1,43 +1,37 @@
-import spidev
+import asyncio
+import threading
+import time
 
-from spi_driver.spi_registers import SpiRegisters
-
-
-class MockSpiDev:
-    transactions = []
-
-    def __init__(self):
-        self._is_opened = False
+import pytest
 
-    def open(self, bus, device):
-        if self._is_opened:
-            raise RuntimeError("SPI device is already opened")
-        self._is_opened = True
+from spi_driver.emulator import BusEmulator
+from spi_driver.modules import BinInput, Bit
+from spi_driver.spi_registers import SpiRegisters
 
-    def xfer2(self, data):
-        self.transactions.append(data)
-        address = data[0] * 255 + data[1]
-        return bytes(
-            [0, 0, *[x % 256 for x in range(address, address + len(data) - 2)]]
-        )
 
+@pytest.fixture
+def bus():
+    # every register holds the low byte of its address
+    bus = BusEmulator(trace=True)
+    bus.registers[:] = bytes(i % 256 for i in range(len(bus.registers)))
+    return bus
 
-def test_spi_registers(monkeypatch):
-    monkeypatch.setattr(spidev, "SpiDev", MockSpiDev)
 
+def test_spi_registers(bus):
     changes = 0
 
     def changed(registers):
         nonlocal changes
         changes += 1
 
-    registers = SpiRegisters()
+    registers = SpiRegisters(transport=bus)
     registers.add_register(0x00)
     registers.add_register(0x01, changed)
     assert registers[0x00] == 0
     assert registers[0x01] == 0
     registers.communicate()
-    assert len(MockSpiDev.transactions) == 2
+    assert len(bus.transactions) == 1
+    assert bus.transactions[-1] == [0x00, 0x01, 0, 0]
 
     assert changes == 1
     assert registers[0x00] == 0
@@ -57,11 +51,12 @@ def test_spi_registers(monkeypatch):
     assert changes == 1
 
     registers.communicate()
-    assert len(MockSpiDev.transactions) == 7
+    assert len(bus.transactions) == 2
+    assert bus.transactions[-1] == [0x00, 0x05, 0, 0, 0, 0, 0, 0]
 
     assert registers[0x00] == 0
     assert registers[0x01] == 1
-    assert registers[0x02] == 0
+    assert registers[0x02] == 2  # bridged gap
     assert registers[0x03] == 3
     assert registers[0x04] == 4
     assert registers[0x05] == 5
@@ -72,5 +67,362 @@ def test_spi_registers(monkeypatch):
 
     registers.communicate()
 
-    assert len(MockSpiDev.transactions) == 13
-    assert MockSpiDev.transactions[-6] == [0x80, 0x10, 0x20]
+    assert len(bus.transactions) == 4
+    assert bus.transactions[-2] == [0x80, 0x10, 0x20]
+
+
+def test_spi_registers_detailed(bus):
+    changes = []
+
+    registers = SpiRegisters(transport=bus)
+    registers.add_register(0x01, lambda r, c: changes.append(c), detailed=True)
+    registers.add_register(0x02, lambda r, c: changes.append(c), detailed=True)
+    registers.communicate()
+    assert changes == [{0x01: 0}, {0x02: 0}] or changes == [{0x02: 0}, {0x01: 0}]
+
+    def owner(registers, changed):
+        changes.append(changed)
+
+    registers.add_register(0x03, owner, detailed=True)
+    registers.add_register(0x04, owner, detailed=True)
+    bus.registers[0x03:0x05] = bytes([0x30, 0x40])
+    registers.communicate()
+    assert changes[2:] == [{0x03: 0, 0x04: 0}]
+
+    bus.registers[0x04] = 0x41
+    registers.communicate()
+    assert changes[3:] == [{0x04: 0x40}]
+
+
+def test_spi_registers_changes(bus):
+    batches = []
+
+    registers = SpiRegisters(transport=bus)
+    inputs = BinInput(registers, 0x10, ["a", "b", None, None, None, None, None, None])
+    bit = Bit(registers, 0x20, 3)
+    registers.communicate()
+    registers.add_changes_listener(lambda t, changes: batches.append((t, changes)))
+
+    bus.registers[0x10] ^= 0b11
+    bus.registers[0x20] ^= 0b1000
+    registers.communicate()
+    assert len(batches) == 1
+    timestamp, changes = batches[0]
+    assert timestamp == registers.cycle_time
+    # 0x10 and 0x20 start out as 0x10 and 0x20
+    assert set(changes) == {(inputs, "a", True), (inputs, "b", True), (bit, None, True)}
+
+    # cycles without transitions are not reported
+    registers.communicate()
+    assert len(batches) == 1
+
+
+def test_spi_registers_snapshot(bus):
+    calls = []
+
+    registers = SpiRegisters(transport=bus)
+    registers.add_register(0x05, lambda r: calls.append(0x05))
+    registers.add_register(0x40, lambda r: calls.append(0x40))
+    registers.snapshot([0x80])
+    # the gaps are too large to be bridged
+    assert bus.transactions == [[0, 0x05, 0], [0, 0x40, 0], [0, 0x80, 0]]
+    assert registers[0x05] == 0x05 and registers[0x40] == 0x40
+
+    registers.communicate()
+    assert calls == []
+
+    # setBit keeps the other bits of the register
+    registers.setBit(0x80, 0, True)
+    registers.communicate()
+    assert bus.registers[0x80] == 0x81
+
+
+def test_spi_registers_snapshot_shared_register(bus):
+    # 0x06 starts out with bits 1 and 2 set
+    registers = SpiRegisters(transport=bus)
+    first = Bit(registers, 0x06, 2)
+    second = Bit(registers, 0x06, 3)
+    events = []
+    first.on("change", lambda value: events.append(("first", value)))
+    second.on("change", lambda value: events.append(("second", value)))
+    registers.snapshot()
+
+    bus.registers[0x06] ^= 0b1000
+    registers.communicate()
+    assert events == [("second", True)]
+
+    bus.registers[0x06] ^= 0b0100
+    registers.communicate()
+    assert events == [("second", True), ("first", False)]
+
+
+def test_spi_registers_read_runs(bus):
+    registers = SpiRegisters(transport=bus)
+    for address in [0x02, 0x03, 0x04, 0x08, 0x20, 0x21, 0x0123]:
+        registers.add_register(address)
+    registers.communicate()
+
+    assert bus.transactions == [
+        [0x00, 0x08, 0, 0, 0, 0, 0, 0, 0],
+        [0x00, 0x21, 0, 0],
+        [0x01, 0x23, 0],
+    ]
+    assert registers[0x02] == 0x02
+    assert registers[0x04] == 0x04
+    assert registers[0x08] == 0x08
+    assert registers[0x20] == 0x20
+    assert registers[0x21] == 0x21
+    assert registers[0x0123] == 0x23
+
+
+def test_spi_registers_read_runs_split(bus):
+    # every third register of a large map, the gaps are bridged but no frame
+    # grows beyond the read burst
+    registers = SpiRegisters(transport=bus)
+    addresses = range(0, 3000, 3)
+    for address in addresses:
+        registers.add_register(address)
+    registers.communicate()
+
+    lengths = [len(frame) - 2 for frame in bus.transactions]
+    assert max(lengths) <= SpiRegisters.READ_BURST
+    assert len(lengths) == 12
+    for address in addresses:
+        assert registers[address] == address & 0xFF
+
+
+def test_spi_registers_write_runs(bus):
+    registers = SpiRegisters(transport=bus)
+    registers[0x20] = 0x04
+    registers[0x11] = 0x02
+    registers[0x12] = 0x03
+    registers[0x10] = 0x01
+    registers.setBit(0x0123, 7, True)
+    registers.communicate()
+
+    assert bus.transactions == [
+        [0x80, 0x12, 0x03, 0x02, 0x01],
+        [0x80, 0x20, 0x04],
+        [0x81, 0x23, 0x80],
+    ]
+
+    registers.communicate()
+    assert len(bus.transactions) == 3
+
+    registers.setBits([(0x30, 0, True), (0x31, 1, True), (0x30, 2, True)])
+    registers.communicate()
+    assert bus.transactions[3:] == [[0x80, 0x31, 0x02, 0x05]]
+
+
+def test_spi_registers_write(bus):
+    registers = SpiRegisters(transport=bus)
+    registers[0x11] = 0x01
+    registers.write(0x12, [0x09, 0x45, 0x57])
+
+    assert bus.transactions == [[0x80, 0x12, 0x09, 0x45, 0x57]]
+
+    registers.communicate()
+
+    assert bus.transactions[-1] == [0x80, 0x11, 0x01]
+
+
+def test_spi_registers_exclusive_bus(bus):
+    registers = SpiRegisters(transport=bus)
+    registers.add_register(0x10)
+    with registers.exclusive_bus() as spi:
+        thread = threading.Thread(target=registers.communicate)
+        thread.start()
+        thread.join(0.05)
+        # the cycle waits for the bus
+        assert thread.is_alive()
+        spi.xfer2([0x00, 0x05, 0])
+    thread.join()
+    assert bus.transactions == [[0x00, 0x05, 0], [0x00, 0x10, 0]]
+
+
+def test_spi_registers_sparse(bus):
+    registers = SpiRegisters(transport=bus)
+    registers.add_register(0x08)
+    registers.communicate()
+
+    assert registers[0x08] == 0x08
+    assert registers[0x09] == 0
+    assert registers[0x7FFF] == 0
+    assert registers.getBit(0x08, 3) is True
+    assert registers.getBit(0x1000, 3) is False
+
+    registers.setBit(0x1000, 3, True)
+    registers.setBit(0x1000, 0, True)
+    registers.setBit(0x1000, 3, False)
+    registers.communicate()
+    assert bus.transactions[-2] == [0x90, 0x00, 0x01]
+
+    with pytest.raises(IndexError):
+        registers[0x8000]
+    with pytest.raises(IndexError):
+        registers[0x8000] = 0
+    with pytest.raises(IndexError):
+        registers.add_register(0x8000)
+    with pytest.raises(ValueError):
+        registers[0x10] = 256
+
+
+def test_spi_registers_threaded(bus):
+    async def main():
+        registers = SpiRegisters(transport=bus)
+        changed = asyncio.Event()
+        threads = []
+
+        def on_change(registers):
+            threads.append(threading.get_ident())
+            changed.set()
+
+        registers.add_register(0x05, on_change)
+        registers[0x10] = 0x20
+        task = asyncio.create_task(registers.communicate_coroutine(threaded=True))
+        await asyncio.wait_for(changed.wait(), 1)
+        task.cancel()
+
+        assert registers[0x05] == 0x05
+        assert threads == [threading.get_ident()]
+        assert bus.transactions[:2] == [[0x80, 0x10, 0x20], [0x00, 0x05, 0]]
+
+    asyncio.run(main())
+
+
+def test_spi_registers_poll_groups(bus):
+    registers = SpiRegisters(period=0.01, transport=bus)
+    registers.add_register(0x01)
+    registers.add_register(0x02, period=0.02)
+    registers.add_register(0x03, period="slow")
+    registers.add_register(0x04, period="slow")
+    registers.add_register(0x04, period=0.04)
+
+    for _ in range(5):
+        registers.communicate()
+
+    assert bus.transactions == [
+        [0x00, 0x04, 0, 0, 0, 0],
+        [0x00, 0x01, 0],
+        [0x00, 0x02, 0, 0],
+        [0x00, 0x01, 0],
+        [0x00, 0x04, 0, 0, 0, 0],
+    ]
+    assert registers[0x03] == 0x03
+
+
+def test_spi_registers_groups(bus):
+    registers = SpiRegisters(period=0.01, transport=bus)
+    registers.add_registers([0x11, 0x10], period="slow")
+    # a faster period for one byte applies to the whole group
+    registers.add_register(0x10, period=0.02)
+    registers.add_register(0x20, period="slow")
+
+    for _ in range(3):
+        registers.communicate()
+
+    assert bus.transactions == [
+        [0x00, 0x11, 0, 0],
+        [0x00, 0x20, 0],
+        [0x00, 0x11, 0, 0],
+    ]
+
+    with pytest.raises(ValueError):
+        registers.add_registers([0x30, 0x32])
+
+
+def test_spi_registers_deadlines(bus):
+    registers = SpiRegisters(period=0.01, transport=bus)
+    registers.add_register(0x01)
+    registers.add_register(0x02, period=0.02)
+
+    assert registers._complete_cycle(1.0, 1.001, 1.004) == pytest.approx(1.01)
+    assert registers._complete_cycle(1.01, 1.012, 1.015) == pytest.approx(1.02)
+    assert registers.overruns == 0
+
+    # the cycle of 1.02 overruns the deadlines at 1.03 and 1.04
+    assert registers._complete_cycle(1.02, 1.02, 1.045) == pytest.approx(1.05)
+    assert registers.cycles == 3
+    assert registers.overruns == 1
+    assert registers.skipped_cycles == 2
+    assert registers.max_jitter == pytest.approx(0.002)
+    assert registers.mean_jitter == pytest.approx(0.001)
+    assert registers.worst_cycle_time == pytest.approx(0.025)
+
+    # the skipped cycles are merged, so the next cycle polls both groups
+    registers.communicate()
+    registers.communicate()
+    registers.communicate()
+    assert bus.transactions == [
+        [0x00, 0x02, 0, 0],
+        [0x00, 0x01, 0],
+        [0x00, 0x02, 0, 0],
+    ]
+
+    registers.reset_timing()
+    assert registers.cycles == 0
+    assert registers.overruns == 0
+
+
+def test_spi_registers_flush(bus):
+    async def main(threaded):
+        bus.transactions.clear()
+        registers = SpiRegisters(period=10, transport=bus)
+        registers.add_register(0x01)
+        task = asyncio.create_task(registers.communicate_coroutine(threaded))
+        await asyncio.sleep(0.01)
+        assert bus.transactions == [[0x00, 0x01, 0]]
+
+        # writes of one event loop iteration go out in one burst
+        registers[0x10] = 0x01
+        registers[0x11] = 0x02
+        await asyncio.wait_for(registers.flush(), 1)
+        assert bus.transactions[1:] == [[0x80, 0x11, 0x02, 0x01]]
+
+        registers.setBit(0x20, 1, True)
+        await asyncio.sleep(0.01)
+        assert bus.transactions[2:] == [[0x80, 0x20, 0x02]]
+
+        await asyncio.wait_for(registers.flush(), 1)
+        task.cancel()
+
+    asyncio.run(main(False))
+    asyncio.run(main(True))
+
+
+def test_spi_registers_flush_without_loop(bus):
+    registers = SpiRegisters(transport=bus)
+    registers[0x10] = 0x01
+    asyncio.run(registers.flush())
+    assert bus.transactions == [[0x80, 0x10, 0x01]]
+
+
+def test_spi_registers_stats(bus, caplog):
+    def changed(registers):
+        pass
+
+    registers = SpiRegisters(log_interval=0, transport=bus)
+    registers.profile_callbacks = True
+    registers.add_register(0x01, changed)
+    registers.add_register(0x10, changed)
+    registers[0x20] = 0x01
+    registers.communicate()
+    registers.communicate()
+
+    stats = registers.stats()
+    assert stats["xfers"]["count"] == 2
+    assert stats["total_xfers"] == 5
+    assert stats["total_bytes"] == 3 + 2 * (3 + 3)
+    assert stats["changed_addresses"]["max"] == 2
+    assert stats["dispatch_time"]["count"] == 2
+    assert list(stats["callbacks"]) == ["test_spi_registers_stats.<locals>.changed"]
+    assert stats["callbacks"]["test_spi_registers_stats.<locals>.changed"]["count"] == 1
+
+    with caplog.at_level("INFO", logger="spi_driver.spi_registers"):
+        now = time.monotonic()
+        registers._complete_cycle(now, now, now + 0.001)
+    assert "1 cycles, 0 overruns" in caplog.text
+    assert "top callback test_spi_registers_stats.<locals>.changed" in caplog.text
+
+    registers.reset_stats()
+    assert registers.stats()["xfers"]["count"] == 0
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from spi_driver.spi_registers import SpiRegisters
+from spi_driver.transports import (
+    MemoryTransport,
+    SocketTransport,
+    Transport,
+    open_transport,
+)
+
+
+def test_memory_transport():
+    with pytest.raises(TypeError):
+        Transport()  # type: ignore[abstract]
+
+    bus = MemoryTransport()
+    assert bus.xfer2([0x80, 0x05, 1, 2, 3]) == [0, 0, 0, 0, 0]
+    assert bus.registers[3:6] == bytearray([3, 2, 1])
+    assert bus.xfer2([0x00, 0x05, 0, 0]) == [0, 0, 1, 2]
+    # stream frames repeat the register
+    assert bus.xfer2([0x40, 0x05, 0, 0]) == [0, 0, 1, 1]
+    assert bus.xfer2([0xC0, 0x07, 4, 5]) == [0, 0, 0, 0]
+    assert bus.registers[6:8] == bytearray([0, 5])
+    # frames below address 0 do not wrap
+    with pytest.raises(IndexError):
+        bus.xfer2([0x00, 0x01, 0, 0, 0])
+    with pytest.raises(IndexError):
+        MemoryTransport(16).xfer2([0x80, 0x10, 1])
+
+    registers = SpiRegisters(transport=bus)
+    changes = []
+    registers.add_register(0x10, lambda r: changes.append(r[0x10]))
+    registers[0x10] = 0x42
+    registers.communicate()
+    assert changes == [0x42]
+    bus.registers[0x10] = 0x43
+    registers.communicate()
+    assert changes == [0x42, 0x43]
+
+
+@pytest.mark.parametrize("unix", [False, True])
+def test_socket_transport(tmp_path, unix):
+    address = str(tmp_path / "spi.sock") if unix else "127.0.0.1:0"
+    bus = MemoryTransport()
+    server = open_transport(address, bus)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+    thread.start()
+    try:
+        transport = SocketTransport(server.server_address)
+        registers = SpiRegisters(transport=transport)
+        registers.add_register(0x11)
+        registers.add_register(0x10)
+        registers.write(0x11, [0x12, 0x34])
+        registers.communicate()
+        assert bus.registers[0x10:0x12] == bytearray([0x34, 0x12])
+        assert (registers[0x10], registers[0x11]) == (0x34, 0x12)
+        transport.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
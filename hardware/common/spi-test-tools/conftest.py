@@ -0,0 +1 @@
+# the test tools are scripts, not a package, the tests import them from here
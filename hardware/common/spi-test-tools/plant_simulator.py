@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# Behavioral models of the axis portals and the warehouse in register terms.
+# Every plant is a bus emulator, the motor registers written by the HAL move
+# the axes, the axes drive the encoder registers, limit switches and sensors.
+#
+# The plant clock runs at speed times real time and advances on every read
+# frame, with speed 0 the plant only moves on explicit step() calls. Drive the
+# HAL with a shorter period for faster than real time runs:
+#
+#   plant = WarehouseV2(speed=10)
+#   hal = HAL(SpiRegisters(period=0.005, transport=plant))
+#
+# Forward drives move an axis towards its low end, positions are in encoder
+# counts from the low end.
+import argparse
+import time
+from typing import List, Optional, Set, Tuple
+
+from spi_driver.emulator import BusEmulator
+from spi_driver.transports import open_transport
+
+# address and bit of a switch or sensor
+Switch = Tuple[int, int]
+
+
+class DcDrive:
+    # direction register 0b01 forward, 0b10 backward, 8 bit speed
+    def __init__(self, direction_address: int, speed_address: int):
+        self.direction_address = direction_address
+        self.speed_address = speed_address
+
+    def speed(self, registers: bytearray) -> float:
+        direction = registers[self.direction_address] & 0b11
+        speed = registers[self.speed_address]
+        if direction == 0b01:
+            return speed
+        if direction == 0b10:
+            return -speed
+        return 0
+
+
+class StepperDrive:
+    # direction register 0b01 forward, 0b10 backward, bit 7 stops the motor,
+    # 16 bit little endian step rate
+    def __init__(self, direction_address: int, speed_address: int):
+        self.direction_address = direction_address
+        self.speed_address = speed_address
+
+    def speed(self, registers: bytearray) -> float:
+        direction = registers[self.direction_address]
+        speed = registers[self.speed_address] | registers[self.speed_address + 1] << 8
+        if direction & 0x80:
+            return 0
+        if direction & 0b11 == 0b01:
+            return speed
+        if direction & 0b11 == 0b10:
+            return -speed
+        return 0
+
+
+class Axis:
+    def __init__(
+        self,
+        drive,
+        gain: float,
+        length: float,
+        position: float,
+        encoder: Optional[int] = None,
+        low: Optional[Switch] = None,
+        high: Optional[Switch] = None,
+    ):
+        # gain converts the drive speed into counts per second
+        self.drive = drive
+        self.gain = gain
+        self.length = length
+        self.position = position
+        self.encoder = encoder
+        self.encoder_offset = 0.0
+        self.low = low
+        self.high = high
+        # a held axis does not move regardless of its drive
+        self.held = False
+
+    def step(self, registers: bytearray, dt: float):
+        if self.held:
+            return
+        position = self.position - self.drive.speed(registers) * self.gain * dt
+        self.position = min(max(position, 0.0), self.length)
+
+    @property
+    def at_low(self) -> bool:
+        return self.position <= 0
+
+    @property
+    def at_high(self) -> bool:
+        return self.position >= self.length
+
+    def reset_encoder(self):
+        self.encoder_offset = self.position
+
+    def encoder_value(self) -> int:
+        return round(self.position - self.encoder_offset) & 0xFFFF
+
+
+class Plant(BusEmulator):
+    # longest simulated time step, sensors narrower than the distance an axis
+    # travels within it may be missed
+    max_step = 0.001
+
+    def __init__(self, speed: float = 1.0, inputs: Tuple[int, ...] = ()):
+        super().__init__(read_only=inputs)
+        self.speed = speed
+        self.time = 0.0
+        self.axes: List[Axis] = []
+        self._last: Optional[float] = None
+
+    def xfer2(self, data):
+        if self.speed and not data[0] & 0x80:
+            now = time.monotonic()
+            if self._last is not None:
+                self.step((now - self._last) * self.speed)
+            self._last = now
+        return super().xfer2(data)
+
+    def step(self, dt: float):
+        while dt > 0:
+            h = min(dt, self.max_step)
+            dt -= h
+            self.time += h
+            for axis in self.axes:
+                axis.step(self.registers, h)
+            self.update()
+
+    def update(self):
+        for axis in self.axes:
+            if axis.encoder is not None:
+                value = axis.encoder_value()
+                self.registers[axis.encoder] = value & 0xFF
+                self.registers[axis.encoder + 1] = value >> 8
+            if axis.low is not None:
+                self.set_input(axis.low, axis.at_low)
+            if axis.high is not None:
+                self.set_input(axis.high, axis.at_high)
+
+    def set_input(self, switch: Switch, value: bool):
+        address, bit = switch
+        if value:
+            self.registers[address] |= 1 << bit
+        else:
+            self.registers[address] &= ~(1 << bit)
+
+    def output(self, switch: Switch) -> bool:
+        address, bit = switch
+        return self.registers[address] & (1 << bit) != 0
+
+
+class _AxisPortal(Plant):
+    # workpieces lie on the table at (x, y), the proximity sensor sees a
+    # workpiece below the lowered head, the magnet picks it up and carries it
+    # until it is switched off
+    proximity: Switch
+    magnet: Switch
+    # distance in counts at which the proximity sensor detects a workpiece
+    proximity_range = 50
+
+    def __init__(self, x: Axis, y: Axis, z: Axis, speed: float, inputs):
+        super().__init__(speed, inputs)
+        self.x, self.y, self.z = x, y, z
+        self.axes = [x, y, z]
+        self.workpieces: List[List[float]] = []
+        self.carried: Optional[List[float]] = None
+
+    def update(self):
+        super().update()
+        head = (self.x.position, self.y.position)
+        below = None
+        if self.z.at_high:
+            for workpiece in self.workpieces:
+                if (
+                    abs(workpiece[0] - head[0]) <= self.proximity_range
+                    and abs(workpiece[1] - head[1]) <= self.proximity_range
+                ):
+                    below = workpiece
+                    break
+
+        if self.output(self.magnet):
+            if self.carried is None and below is not None:
+                self.carried = below
+        else:
+            self.carried = None
+        if self.carried is not None:
+            self.carried[0], self.carried[1] = head
+        self.set_input(self.proximity, self.carried is not None or below is not None)
+
+
+class AxisPortalV1(_AxisPortal):
+    proximity = (2, 0)
+    magnet = (19, 0)
+    x_reference = (3, 2)
+    y_reference = (3, 5)
+    # reference switches are active within reference_width of the reference
+    # positions
+    reference_width = 20
+
+    def __init__(self, speed: float = 1.0):
+        super().__init__(
+            x=Axis(DcDrive(13, 14), 10, 3000, 1500, 9, low=(3, 0), high=(3, 1)),
+            y=Axis(DcDrive(15, 16), 10, 3000, 1500, 11, low=(3, 3), high=(3, 4)),
+            z=Axis(DcDrive(17, 18), 4, 1000, 0, low=(3, 7), high=(3, 6)),
+            speed=speed,
+            inputs=(2, 3, 9, 10, 11, 12),
+        )
+        self.x_reference_position = 100.0
+        self.y_reference_position = 100.0
+        self.update()
+
+    def update(self):
+        super().update()
+        self.set_input(
+            self.x_reference,
+            abs(self.x.position - self.x_reference_position) <= self.reference_width,
+        )
+        self.set_input(
+            self.y_reference,
+            abs(self.y.position - self.y_reference_position) <= self.reference_width,
+        )
+
+
+class AxisPortalV2(_AxisPortal):
+    proximity = (2, 6)
+    magnet = (25, 0)
+
+    def __init__(self, speed: float = 1.0):
+        super().__init__(
+            x=Axis(StepperDrive(11, 12), 0.08, 3000, 1500, 7, low=(2, 0), high=(2, 1)),
+            y=Axis(StepperDrive(17, 18), 0.08, 3000, 1500, 9, low=(2, 3), high=(2, 2)),
+            z=Axis(DcDrive(23, 24), 4, 1000, 0, low=(2, 5), high=(2, 4)),
+            speed=speed,
+            inputs=(2, 7, 8, 9, 10),
+        )
+        self.update()
+
+
+class WarehouseV2(Plant):
+    # shelf positions of warehouse_v2_crosslab.hal, the position sensors are
+    # active within sensor_width of them
+    x_positions = [607, 1807, 3007, 4207, 5407, 6607, 7807, 9007, 10207, 11407]
+    z_positions = [894, 11324, 21754, 32184, 42614]
+    sensor_width = 100
+    x_sensors = [(3, i) for i in range(8)] + [(4, 0), (4, 1)]
+    z_sensors = [(4, i) for i in range(2, 7)]
+    reset_x_encoder = (1, 0)
+    reset_z_encoder = (1, 1)
+    # the hold bits stop an axis at the next shelf position
+    hold_x = (1, 2)
+    hold_z = (1, 3)
+    inductive = (2, 6)
+
+    def __init__(self, speed: float = 1.0):
+        super().__init__(speed, inputs=(2, 3, 4, 9, 10, 11, 12))
+        # the fork retracts towards the low end (y_outside)
+        self.x = Axis(StepperDrive(13, 14), 0.04, 12000, 5000, 9, (2, 0), (2, 1))
+        self.y = Axis(DcDrive(19, 20), 4, 1000, 500, None, (2, 2), (2, 3))
+        self.z = Axis(StepperDrive(21, 22), 0.15, 44000, 20000, 11, (2, 4), (2, 5))
+        self.axes = [self.x, self.y, self.z]
+        # (x, z) shelf indices holding a box, the inductive sensor sees the
+        # box when the fork is inserted into its shelf
+        self.boxes: Set[Tuple[int, int]] = set()
+        self.update()
+
+    def update(self):
+        if self.output(self.reset_x_encoder):
+            self.x.reset_encoder()
+        if self.output(self.reset_z_encoder):
+            self.z.reset_encoder()
+        super().update()
+
+        x_encoder = self.x.encoder_value()
+        z_encoder = self.z.encoder_value()
+        shelf_x = shelf_z = None
+        for i, (switch, position) in enumerate(zip(self.x_sensors, self.x_positions)):
+            active = abs(x_encoder - position) <= self.sensor_width
+            self.set_input(switch, active)
+            if active:
+                shelf_x = i
+        for i, (switch, position) in enumerate(zip(self.z_sensors, self.z_positions)):
+            active = abs(z_encoder - position) <= self.sensor_width
+            self.set_input(switch, active)
+            if active:
+                shelf_z = i
+        self.x.held = self.output(self.hold_x) and shelf_x is not None
+        self.z.held = self.output(self.hold_z) and shelf_z is not None
+        self.set_input(
+            self.inductive, self.y.at_high and (shelf_x, shelf_z) in self.boxes
+        )
+
+
+PLANTS = {
+    "axis_portal_v1": AxisPortalV1,
+    "axis_portal_v2": AxisPortalV2,
+    "warehouse_v2": WarehouseV2,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serves a simulated board to SocketTransport clients"
+    )
+    parser.add_argument("board", choices=PLANTS)
+    parser.add_argument("address", help="unix socket path or host:port to listen on")
+    parser.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = open_transport(args.address, PLANTS[args.board](args.speed))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
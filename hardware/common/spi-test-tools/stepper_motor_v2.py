@@ -26,7 +26,10 @@ class StepperMotor(AsyncIOEventEmitter):
         self.slow_down_distance = 0
 
         self._registers.add_register(self._address, self._calculatePostitionRegisters)
-        for r in range(self._address+6, self._address+16):
+        # ENC_DIVISION and ACCELERATION are configuration words
+        for r in range(self._address+6, self._address+10):
+            self._registers.add_register(r, self._calculatePostitionRegisters, period="slow")
+        for r in range(self._address+10, self._address+16):
             self._registers.add_register(r, self._calculatePostitionRegisters)
 
     def _set_speed_register(self, speed: float):
@@ -290,8 +293,10 @@ async def main_async():
     #registers.communicate()
 
     xMotor = StepperMotor(registers, start_address)
-    for i in range(start_address, start_address+16):
-        registers.add_register(i)
+    # the registers polled by the motor keep their periods, the fastest
+    # period of an address wins
+    for i in range(start_address+1, start_address+6):
+        registers.add_register(i, period=0.1)
     asyncio.create_task(registers.communicate_coroutine())
     asyncio.create_task(output_coroutine())
     await asyncio.create_task(input_coroutine())
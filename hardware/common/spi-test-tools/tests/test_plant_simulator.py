@@ -0,0 +1,94 @@
+import pytest
+
+from plant_simulator import PLANTS, AxisPortalV1, AxisPortalV2, WarehouseV2
+
+
+def encoder(plant, address):
+    return plant.registers[address] | plant.registers[address + 1] << 8
+
+
+def test_limit_switch():
+    plant = AxisPortalV1(speed=0)
+    assert not plant.output((3, 0))
+    # forward at full speed moves x by 2550 counts/s towards its low end
+    plant.registers[13] = 0b01
+    plant.registers[14] = 255
+    plant.step(0.5)
+    assert plant.x.position == pytest.approx(225)
+    assert not plant.output((3, 0))
+    plant.step(0.5)
+    assert plant.x.position == 0
+    assert plant.output((3, 0))
+    assert not plant.output((3, 1))
+    assert encoder(plant, 9) == 0
+
+    plant.registers[13] = 0b10
+    plant.step(2)
+    assert plant.x.position == 3000
+    assert not plant.output((3, 0))
+    assert plant.output((3, 1))
+
+
+def test_encoder_counts():
+    plant = AxisPortalV2(speed=0)
+    assert encoder(plant, 7) == 1500
+    # 10000 steps/s backward are 800 counts/s
+    plant.registers[11] = 0b10
+    plant.registers[12] = 10000 & 0xFF
+    plant.registers[13] = 10000 >> 8
+    plant.step(1)
+    assert encoder(plant, 7) == 2300
+    # bit 7 stops the motor
+    plant.registers[11] |= 0x80
+    plant.step(1)
+    assert encoder(plant, 7) == 2300
+
+
+def test_hold():
+    plant = WarehouseV2(speed=0)
+    # forward with the hold bit set stops x at the next shelf, 4207
+    plant.registers[1] = 1 << 2
+    plant.registers[13] = 0b01
+    plant.registers[14] = 10000 & 0xFF
+    plant.registers[15] = 10000 >> 8
+    plant.step(5)
+    assert plant.x.held
+    assert abs(encoder(plant, 9) - 4207) <= plant.sensor_width
+    assert plant.output((3, 3))
+
+    plant.registers[1] = 0
+    plant.step(1)
+    assert not plant.x.held
+    assert encoder(plant, 9) < 4207 - plant.sensor_width
+
+    # the encoder reset zeroes the counter at the current position
+    plant.registers[1] = 1 << 0
+    plant.step(0.001)
+    assert encoder(plant, 9) == 0
+
+
+@pytest.mark.parametrize(
+    "board, encoders, switches, inputs",
+    [
+        # z starts at its top end
+        ("axis_portal_v1", {9: 1500, 11: 1500}, (2, 3), {(3, 7)}),
+        ("axis_portal_v2", {7: 1500, 9: 1500}, (2,), {(2, 5)}),
+        ("warehouse_v2", {9: 5000, 11: 20000}, (2, 3, 4), set()),
+    ],
+)
+def test_register_layout(board, encoders, switches, inputs):
+    plant = PLANTS[board](speed=0)
+    assert {*encoders, *(a + 1 for a in encoders), *switches} <= plant.read_only
+    for address, value in encoders.items():
+        assert encoder(plant, address) == value
+    for address in switches:
+        for bit in range(8):
+            assert plant.output((address, bit)) == ((address, bit) in inputs)
+
+    # inputs are read-only on the bus, outputs are written
+    address = min(plant.read_only)
+    before = plant.registers[address]
+    plant.xfer2([0x80, address, before ^ 0xFF])
+    assert plant.registers[address] == before
+    plant.xfer2([0x80, 0x1F, 0x42])
+    assert plant.registers[0x1F] == 0x42